@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Run chat turns for a JSONL file of messages, e.g. for offline evaluation.
+
+    python batch_chat.py questions.jsonl [--output results.jsonl] [--concurrency 8]
+
+Each line is a JSON object with "message" (or "question", "prompt", "body"),
+and optionally "id" and "conversation_id". Results are written as JSONL in
+completion order; the throughput summary goes to stderr.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from src.admission import admission
+from src.batch import run_batch
+from src.settings import settings
+from src.vector_db import vector_db
+
+
+async def run(args):
+    await vector_db.initialize()
+    # No interactive traffic in this process: batch turns may use every run slot
+    admission.capacity = admission.batch_capacity = args.concurrency
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    summary = None
+    try:
+        with open(args.input, "r", encoding="utf-8") as lines:
+            async for result in run_batch(lines, args.concurrency, timeout=args.timeout or None):
+                if "summary" in result:
+                    summary = result["summary"]
+                    continue
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch chat runs over JSONL input")
+    parser.add_argument("input")
+    parser.add_argument("--output", help="Results file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=settings.batch_concurrency)
+    parser.add_argument("--timeout", type=float, default=settings.request_timeout, help="Seconds per item (0 = none)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print(
+        f"{'❌' if summary['errors'] else '✅'} {summary['items']} items ({summary['errors']} errors) in {summary['elapsed_seconds']}s: "
+        f"{summary['items_per_second']} items/s, p50 {summary['p50_seconds']}s, p95 {summary['p95_seconds']}s, "
+        f"{summary['input_tokens']}/{summary['output_tokens']} tokens in/out, "
+        f"{summary['shared_search_hits']} shared search hits",
+        file=sys.stderr
+    )
+    if summary["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""End-to-end chat latency and throughput with LLM calls replayed from a cassette.
+
+Runs scripted multi-turn conversations concurrently through the full agent
+pipeline (tools, vector search, memory and, with --api, the HTTP layer).
+Model calls are answered from the cassette, so the run needs no API key and
+is reproducible. Record the cassette once against the real model with
+--record (needs OPENAI_API_KEY); replays of the recorded conversations never
+call the model.
+
+Usage: python benchmarks/bench_chat_replay.py [--record] [--conversations 20] [--concurrency 8] [--latency 0.5] [--api]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRIPTS = [
+    [
+        "Hi there!",
+        "I'm looking for a mountain bike for rough trails, budget around 2000 dollars",
+        "Which of those has the best suspension?",
+        "What is your return policy?",
+    ],
+    [
+        "Hello",
+        "I need a city bike for commuting to work",
+        "Do you have anything electric under 3000?",
+        "Do you offer financing?",
+        "Great, my name is Alex Doe and my email is alex@example.com, please have someone call me",
+    ],
+    [
+        "Hey, I want a road bike for racing",
+        "Carbon frame please, what do you have?",
+        "How long is the warranty?",
+    ],
+]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_conversation(index: int, script, send, latencies):
+    conversation_id = f"bench-{index}"
+    for message in script:
+        started = time.perf_counter()
+        await send(message, conversation_id)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    from src.agent import chat_with_sales_agent
+    from src.usage import usage_tracker
+    from src.vector_db import vector_db
+
+    await vector_db.initialize()
+
+    client = None
+    if args.api:
+        import httpx
+        from src.api import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+
+        async def send(message, conversation_id):
+            response = await client.post("/chat", json={"message": message, "conversation_id": conversation_id})
+            response.raise_for_status()
+    else:
+        async def send(message, conversation_id):
+            await chat_with_sales_agent(message, conversation_id)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def limited(index):
+        async with semaphore:
+            await run_conversation(index, SCRIPTS[index % len(SCRIPTS)], send, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(args.conversations)))
+    elapsed = time.perf_counter() - started
+    if client is not None:
+        await client.aclose()
+
+    total = usage_tracker.total
+    print(f"mode={args.mode} conversations={args.conversations} concurrency={args.concurrency} turns={len(latencies)}")
+    print(f"elapsed {elapsed:.2f}s  throughput {len(latencies) / elapsed:.2f} turns/s")
+    print(f"turn latency p50 {statistics.median(latencies) * 1000:.0f} ms  "
+          f"p95 {percentile(latencies, 95) * 1000:.0f} ms  max {max(latencies) * 1000:.0f} ms")
+    print(f"llm requests {total.requests}  tool calls {total.tool_calls}  "
+          f"tokens in/out {total.input_tokens}/{total.output_tokens}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="Call the real model and record its responses")
+    parser.add_argument("--cassette", default=os.path.join(ROOT, "data", "cassettes", "agent.jsonl"))
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=-1.0, help="Seconds per replayed LLM call (negative = as recorded)")
+    parser.add_argument("--api", action="store_true", help="Send turns through the FastAPI app instead of calling the agent")
+    args = parser.parse_args()
+
+    args.mode = "record" if args.record else "replay"
+    if args.record:
+        # Each script only needs recording once
+        args.conversations = len(SCRIPTS)
+    # Settings are read at import, so configure them before importing the app
+    os.environ["LLM_CASSETTE_MODE"] = args.mode
+    os.environ["LLM_CASSETTE_PATH"] = args.cassette
+    os.environ["LLM_CASSETTE_LATENCY"] = str(args.latency)
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    os.environ.setdefault("MAX_CONCURRENT_RUNS", str(args.concurrency))
+    # Retrieved context is part of the prompt; a skipped retrieval would not match the recording
+    os.environ.setdefault("SPECULATIVE_RETRIEVAL_TIMEOUT", "30")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Recall@k and memory of int8/binary quantized search against the float baseline.
+
+Embeds the real catalog (and FAQ questions as extra queries) when
+sentence-transformers is installed, and always runs a synthetic catalog
+at larger sizes.
+
+Usage: python benchmarks/bench_quantization.py [--k 5] [--sizes 1000 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.lexical_index import bike_to_text  # noqa: E402
+from src.vector_backends import NumpyCollection  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "mountain bike for trails", "cheap city bike for commuting", "carbon road bike for racing",
+    "electric bike with long range", "bike for my kid", "gravel bike for touring",
+    "cargo bike for the family", "bike for snow and sand", "lightweight bike", "comfortable hybrid",
+]
+
+
+def recall_at_k(baseline: NumpyCollection, candidate: NumpyCollection, queries: np.ndarray, k: int) -> float:
+    """Fraction of the float top-k ids that the quantized search also returns."""
+    hits = 0
+    for query in queries:
+        expected = {hit.id for hit in baseline.search(query, k)}
+        found = {hit.id for hit in candidate.search(query, k)}
+        hits += len(expected & found)
+    return hits / (len(queries) * min(k, len(baseline.ids)))
+
+
+def report(label: str, ids, vectors: np.ndarray, queries: np.ndarray, k: int, multipliers):
+    """Print recall and resident memory per quantization mode."""
+    payloads = [{"id": int(i)} for i in ids]
+    baseline = NumpyCollection(vectors.shape[1])
+    baseline.upsert(ids, vectors, payloads)
+    float_bytes = baseline.memory_bytes()["vectors"]
+    print(f"\n{label}: {len(ids)} vectors, float32 = {float_bytes / 1024:.1f} KiB")
+    print(f"{'mode':>8} {'rescore x':>9} {f'recall@{k}':>10} {'heap+codes KiB':>15} {'ratio':>6} "
+          f"{'with floats KiB':>16} {'ratio':>6}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("int8", "binary"):
+            for multiplier in multipliers:
+                collection = NumpyCollection(vectors.shape[1], mode, multiplier)
+                collection.upsert(ids, vectors, payloads)
+                collection.save(directory, mode, "bench")
+                mapped = NumpyCollection.load(directory, mode, "bench", quantization=mode,
+                                              rescore_multiplier=multiplier)
+                sizes = mapped.memory_bytes()
+                # Codes are scanned on every search, so they are resident even when memory-mapped;
+                # the mapped floats are only paged in by rescoring, up to all of them under load
+                resident = sizes["vectors"] + sizes["codes"] + sizes["ids"] + mapped.codes.nbytes
+                total = sum(sizes.values())
+                recall = recall_at_k(baseline, mapped, queries, k)
+                print(f"{mode:>8} {multiplier:>9} {recall:>10.3f} {resident / 1024:>15.1f} "
+                      f"{float_bytes / resident:>5.1f}x {total / 1024:>16.1f} {float_bytes / total:>5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000])
+    parser.add_argument("--multipliers", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("sentence-transformers not installed; skipping real catalog")
+    else:
+        encoder = SentenceTransformer("all-MiniLM-L6-v2")
+        with open(os.path.join(ROOT, "Data", "product_catalog.json"), "r") as f:
+            bikes = json.load(f)
+        vectors = encoder.encode([bike_to_text(bike) for bike in bikes])
+        queries = encoder.encode(SAMPLE_QUERIES)
+        report("catalog", [bike["id"] for bike in bikes], vectors, queries, args.k, args.multipliers)
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        # Clustered vectors resemble real embeddings better than isotropic noise
+        centers = rng.standard_normal((32, 384)).astype(np.float32)
+        vectors = centers[rng.integers(0, 32, size)] + 0.6 * rng.standard_normal((size, 384)).astype(np.float32)
+        queries = vectors[rng.integers(0, size, 100)] + 0.3 * rng.standard_normal((100, 384)).astype(np.float32)
+        report("synthetic", list(range(1, size + 1)), vectors, queries, args.k, args.multipliers)
+
+
+if __name__ == "__main__":
+    main()
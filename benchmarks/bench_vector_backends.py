@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Compare Qdrant and NumPy vector backends at several catalog sizes.
+
+Usage: python benchmarks/bench_vector_backends.py [--sizes 100 1000 5000] [--queries 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vector_backends import NumpyBackend, QdrantBackend  # noqa: E402
+
+DIM = 384
+
+
+def run(backend, queries: np.ndarray, limit: int, allowed_ids=None) -> float:
+    """Return mean query latency in milliseconds."""
+    start = time.perf_counter()
+    for query in queries:
+        backend.search("bench", query, limit, allowed_ids)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, DIM)).astype(np.float32)
+
+    print(f"{'size':>8} {'backend':>8} {'index s':>9} {'ms/query':>9} {'ms/query (filtered)':>20}")
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+        ids = list(range(1, size + 1))
+        payloads = [{"id": i, "price_eur": int(rng.integers(300, 5000))} for i in ids]
+        # Roughly a "price_max" filter keeping a third of the catalog
+        allowed = {p["id"] for p in payloads if p["price_eur"] < 1800}
+
+        for name, backend in (("qdrant", QdrantBackend()), ("numpy", NumpyBackend())):
+            start = time.perf_counter()
+            backend.create_collection("bench", DIM)
+            backend.upsert("bench", ids, vectors, payloads)
+            index_time = time.perf_counter() - start
+
+            plain = run(backend, queries, args.limit)
+            filtered = run(backend, queries, args.limit, allowed)
+            print(f"{size:>8} {name:>8} {index_time:>9.2f} {plain:>9.3f} {filtered:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Check ONNX encoder parity with the PyTorch encoder and compare latency.
+
+Encodes the catalog and FAQ texts with both encoders, reports the minimum
+and mean cosine agreement, per-query latency and process RSS, and exits
+non-zero if any pair falls below --min-cosine.
+
+Usage: python benchmarks/encoder_parity.py [--quantize] [--threads 4] [--min-cosine 0.99]
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.encoders import OnnxEncoder, SentenceTransformerEncoder  # noqa: E402
+from src.lexical_index import bike_to_text  # noqa: E402
+
+
+def load_texts() -> list:
+    """Catalog texts as indexed plus raw FAQ lines and a few short queries."""
+    with open(os.path.join(ROOT, "Data", "product_catalog.json"), "r") as f:
+        texts = [bike_to_text(bike) for bike in json.load(f)]
+    with open(os.path.join(ROOT, "Data", "faq.txt"), "r") as f:
+        texts += [line.strip() for line in f if line.strip()]
+    return texts + ["mountain bike under 1500", "do you ship to Austria?", "Cube", "29 inch hydraulic disc"]
+
+
+def query_latency_ms(encoder, texts: list) -> float:
+    """Mean single-text encode latency in milliseconds."""
+    encoder.encode(texts[0])
+    start = time.perf_counter()
+    for text in texts:
+        encoder.encode(text)
+    return (time.perf_counter() - start) / len(texts) * 1000
+
+
+def rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quantize", action="store_true", help="Compare the int8-quantized ONNX model")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    texts = load_texts()
+
+    onnx = OnnxEncoder(threads=args.threads, quantize=args.quantize)
+    onnx_vectors = onnx.encode(texts)
+    print(f"{onnx.name}: {query_latency_ms(onnx, texts):.2f} ms/query, peak RSS {rss_mb():.0f} MiB")
+
+    torch = SentenceTransformerEncoder(threads=args.threads)
+    torch_vectors = torch.encode(texts)
+    print(f"{torch.name}: {query_latency_ms(torch, texts):.2f} ms/query, peak RSS {rss_mb():.0f} MiB (both loaded)")
+
+    torch_vectors = torch_vectors / np.linalg.norm(torch_vectors, axis=1, keepdims=True)
+    cosines = np.sum(onnx_vectors * torch_vectors, axis=1)
+    print(f"cosine agreement over {len(texts)} texts: min {cosines.min():.5f}, mean {cosines.mean():.5f}")
+
+    if cosines.min() < args.min_cosine:
+        worst = int(np.argmin(cosines))
+        print(f"FAIL: below {args.min_cosine} for {texts[worst]!r}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Build or validate prebuilt catalog/FAQ index artifacts.
+
+    python build_index.py build [--output ./data/index] [--workers 4] [--quantization int8]
+    python build_index.py validate ./data/index
+
+Point API workers at the output with INDEX_ARTIFACT_PATH=./data/index.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from src.index_artifact import build_artifact, validate_artifact
+from src.settings import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Prebuilt index artifacts for the bike sales agent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Embed the catalog feed (CATALOG_PATH) and FAQ into a new artifact version")
+    build.add_argument("--output", default="./data/index")
+    build.add_argument("--workers", type=int, default=settings.index_workers)
+    build.add_argument("--quantization", choices=["none", "int8", "binary"], default=settings.vector_quantization)
+
+    validate = commands.add_parser("validate", help="Check an artifact's manifest, checksums and vectors")
+    validate.add_argument("path")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        settings.index_workers = args.workers
+        settings.bulk_index_min_records = 0 if args.workers > 1 else settings.bulk_index_min_records
+        settings.vector_quantization = args.quantization
+        artifact_dir = asyncio.run(build_artifact(args.output))
+        print(f"✅ Built index artifact {artifact_dir}")
+    else:
+        errors = validate_artifact(args.path)
+        for error in errors:
+            print(f"❌ {error}")
+        if errors:
+            sys.exit(1)
+        print(f"✅ {args.path} is valid")
+
+
+if __name__ == "__main__":
+    main()
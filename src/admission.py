@@ -0,0 +1,214 @@
+"""Admission control for LLM-bound requests: bounded concurrency, a fair bounded queue and load shedding."""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+from .deadlines import remaining
+from .metrics import REGISTRY
+from .settings import settings
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint."""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """At most `capacity` agent runs at a time; the rest wait in a bounded queue.
+
+    Waiters are queued per client and slots are handed out round-robin across
+    clients, so one chatty client cannot starve the others. Requests are shed
+    up front when the client already has too many requests in the system, the
+    queue is full, or the expected queue wait exceeds the wait budget.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, max_wait: float, per_client: int, batch_capacity: int = 0):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.per_client = per_client
+        self.batch_capacity = batch_capacity
+        self.active = 0
+        self.queued = 0
+        self.batch_active = 0
+        self._batch_waiters: Deque[asyncio.Future] = deque()
+        # Seeded with a guess; updated with an exponentially weighted average of run times
+        self.service_time = 5.0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._client_load: Dict[str, int] = defaultdict(int)
+
+        self.metric_active = REGISTRY.gauge("agent_runs_active", "Agent runs in progress", lambda: self.active)
+        self.metric_queued = REGISTRY.gauge("agent_runs_queued", "Requests waiting for an agent run slot", lambda: self.queued)
+        self.metric_wait = REGISTRY.histogram("agent_queue_wait_seconds", "Time spent waiting for an agent run slot")
+        self.metric_shed = REGISTRY.counter("agent_requests_shed_total", "Requests rejected by admission control")
+        self.metric_admitted = REGISTRY.counter("agent_requests_admitted_total", "Requests admitted to an agent run")
+        self.metric_batch_active = REGISTRY.gauge(
+            "agent_batch_runs_active", "Batch turns holding an agent run slot", lambda: self.batch_active
+        )
+        self.metric_batch_queued = REGISTRY.gauge(
+            "agent_batch_runs_queued", "Batch turns waiting for an agent run slot", lambda: len(self._batch_waiters)
+        )
+
+    def expected_wait(self) -> float:
+        """Rough queue wait for a new arrival, from queue depth and average run time."""
+        if self.active < self.capacity and not self.queued:
+            return 0.0
+        return (self.queued + 1) * self.service_time / max(1, self.capacity)
+
+    def _shed(self, status_code: int, reason: str, label: str) -> Overloaded:
+        self.metric_shed.inc(reason=label)
+        retry_after = max(1, math.ceil(self.expected_wait() or self.service_time))
+        return Overloaded(status_code, retry_after, reason)
+
+    def _check(self, client: str):
+        if self._client_load.get(client, 0) >= self.per_client:
+            raise self._shed(429, "Too many concurrent requests from this client", "client_limit")
+        if self.active >= self.capacity:
+            if self.queued >= self.max_queue:
+                raise self._shed(503, "Server busy, queue is full", "queue_full")
+            if self.expected_wait() > self.max_wait:
+                raise self._shed(503, "Server busy, expected wait too long", "queue_time")
+
+    async def acquire(self, client: str):
+        """Take a run slot, waiting in the client's queue if all slots are busy."""
+        self._check(client)
+        self._client_load[client] += 1
+
+        if self.active < self.capacity and not self.queued:
+            self.active += 1
+            self.metric_wait.observe(0.0)
+            self.metric_admitted.inc()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(waiter)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            # Never wait past the request's own deadline
+            await asyncio.wait_for(waiter, remaining(self.max_wait))
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended; give it back
+                self._release_slot()
+            else:
+                self._remove_waiter(client, waiter)
+            self._client_done(client)
+            self.metric_wait.observe(time.perf_counter() - started)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed(503, "Server busy, timed out waiting in queue", "queue_timeout")
+            raise
+        self.metric_wait.observe(time.perf_counter() - started)
+        self.metric_admitted.inc()
+
+    def release(self, client: str, run_seconds: float):
+        """Free a run slot and hand it to the next client in round-robin order."""
+        self.service_time = 0.8 * self.service_time + 0.2 * run_seconds
+        self._client_done(client)
+        self._release_slot()
+
+    @asynccontextmanager
+    async def slot(self, client: str):
+        """Hold an agent run slot for the duration of the block."""
+        await self.acquire(client)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(client, time.perf_counter() - started)
+
+    def _batch_can_run(self) -> bool:
+        return self.active < self.capacity and not self.queued and self.batch_active < self.batch_capacity
+
+    async def acquire_batch(self):
+        """Take a run slot for a batch turn.
+
+        Batch turns share the capacity of interactive requests but never shed:
+        they wait until a slot is free that no interactive request is waiting
+        for, and hold at most `batch_capacity` slots at a time.
+        """
+        if self._batch_can_run() and not self._batch_waiters:
+            self.active += 1
+            self.batch_active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._batch_waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release_batch()
+            elif waiter in self._batch_waiters:
+                self._batch_waiters.remove(waiter)
+            raise
+
+    def release_batch(self):
+        self.batch_active -= 1
+        self._release_slot()
+
+    @asynccontextmanager
+    async def batch_slot(self):
+        """Hold a batch run slot for the duration of the block."""
+        await self.acquire_batch()
+        try:
+            yield
+        finally:
+            self.release_batch()
+
+    def _wake_batch(self):
+        while self._batch_waiters and self._batch_can_run():
+            waiter = self._batch_waiters.popleft()
+            if waiter.done():
+                continue
+            self.active += 1
+            self.batch_active += 1
+            waiter.set_result(None)
+
+    def _release_slot(self):
+        while self._waiters:
+            client, queue = next(iter(self._waiters.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(client)
+            else:
+                del self._waiters[client]
+            if waiter.done():
+                # Timed out or cancelled; its own handler updates the counts
+                continue
+            self.queued -= 1
+            waiter.set_result(None)
+            return
+        self.active -= 1
+        # Interactive requests go first; batch turns get what is left
+        self._wake_batch()
+
+    def _remove_waiter(self, client: str, waiter: asyncio.Future):
+        queue = self._waiters.get(client)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiters[client]
+        self.queued -= 1
+
+    def _client_done(self, client: str):
+        self._client_load[client] -= 1
+        if self._client_load[client] <= 0:
+            del self._client_load[client]
+
+
+admission = AdmissionController(
+    capacity=settings.max_concurrent_runs,
+    max_queue=settings.max_queued_runs,
+    max_wait=settings.max_queue_wait,
+    per_client=settings.max_runs_per_client,
+    batch_capacity=settings.max_batch_runs
+)
@@ -1,10 +1,28 @@
 """Main bike sales agent using PydanticAI."""
 
+import asyncio
+import re
+import time
+from typing import AsyncContextManager, AsyncIterable, Awaitable, Callable, Dict, List, Optional, Tuple
+from functools import lru_cache
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.exceptions import UsageLimitExceeded
+from pydantic_ai.usage import RunUsage, UsageLimits
+from pydantic_ai.messages import (
+    AgentStreamEvent, FunctionToolCallEvent, FunctionToolResultEvent, ModelMessage, ModelRequest,
+    PartDeltaEvent, PartStartEvent, SystemPromptPart, TextPart, TextPartDelta, UserPromptPart
+)
+from pydantic_ai.models import Model, infer_model
 from .dependencies import SalesAgentDependencies
 from .tools import product_search_tool, create_lead_tool, faq_search_tool, conversation_memory_tool
 from .settings import settings
 from .vector_db import vector_db
+from .catalog_index import get_catalog_index
+from .cassette import cassette_model
+from .conversations import ChatSession, ConversationLocks
+from .deadlines import DeadlineExceeded, remaining, run_with_deadline
+from .metrics import REGISTRY
+from .usage import usage_tracker
 
 # Create the sales agent with proper dependencies
 sales_agent = Agent(
@@ -22,14 +40,41 @@ Key behaviors:
 
 IMPORTANT: When customers mention bike types or budgets, use the product_search tool to show them actual bikes from our catalog. Don't just ask questions - provide concrete recommendations.
 
+Messages may start with "Retrieved context": catalog and FAQ matches looked up for that message. Use them when they answer the question; call tools for anything they don't cover. When a message asks several independent things (e.g. a product and a policy question), call all the needed tools together in one step.
+
 Tools available:
 - product_search: Search bike catalog with query and optional filters
 - create_lead: Create lead when customer shows interest
 - faq_search: Search FAQ for common questions
-- conversation_memory: Maintain conversation context"""
+- conversation_memory: Maintain conversation context""",
+    # Independent tool calls from one model response run concurrently
+    model_settings={"parallel_tool_calls": True}
 )
 
 
+@sales_agent.system_prompt
+def catalog_primer() -> str:
+    """Catalog overview appended to the system prompt.
+    
+    Built from sorted facet counts, so it is byte-identical across turns and
+    conversations until the catalog changes, keeping the prompt prefix cacheable.
+    """
+    try:
+        index = get_catalog_index()
+        facets = index.facets(index.all_positions)
+    except Exception:
+        return ""
+    if not facets["total"]:
+        return ""
+    types = ", ".join(f"{name} ({count})" for name, count in facets["facets"]["type"].items())
+    brands = ", ".join(facets["facets"]["brand"])
+    return (
+        f"Catalog overview: {facets['total']} bikes, priced €{facets['price']['min']}–€{facets['price']['max']}.\n"
+        f"Types: {types}.\n"
+        f"Brands: {brands}."
+    )
+
+
 # Register the 4 required tools
 @sales_agent.tool
 async def product_search(
@@ -77,44 +122,400 @@ async def conversation_memory(
 # Global memory store to persist across requests
 GLOBAL_MEMORY = {}
 
-# Chat function for API
-async def chat_with_sales_agent(message: str, conversation_id: str) -> str:
-    """Chat with the sales agent."""
-    dependencies = SalesAgentDependencies()
+# Model messages per conversation, replayed as message_history so each turn
+# extends the previous request byte for byte (system prompt, tools, earlier turns)
+MESSAGE_HISTORY: Dict[str, List[ModelMessage]] = {}
+
+
+def trim_history(messages: List[ModelMessage], max_messages: int, keep: Optional[int] = None) -> List[ModelMessage]:
+    """Once over max_messages, drop the oldest whole turns down to keep messages, keeping the system prompt first.
+
+    keep defaults to half of max_messages: trimming in coarse steps leaves the
+    history prefix unchanged for many turns between trims, so provider prompt
+    caching keeps hitting instead of missing right after the system prompt.
+    """
+    if len(messages) <= max_messages:
+        return messages
+    keep = max_messages // 2 if keep is None else keep
+    turn_starts = [
+        index for index, message in enumerate(messages)
+        if isinstance(message, ModelRequest) and any(isinstance(part, UserPromptPart) for part in message.parts)
+    ]
+    start = next((index for index in turn_starts if len(messages) - index <= keep), turn_starts[-1])
+    if start == 0:
+        return messages
+    system_parts = [part for part in messages[0].parts if isinstance(part, SystemPromptPart)]
+    first = messages[start]
+    return [ModelRequest(parts=system_parts + list(first.parts), instructions=first.instructions)] + messages[start + 1:]
+
+
+def format_retrieved_context(bikes: List[Dict], faqs: List[Dict]) -> str:
+    """Compact prompt block with speculative catalog and FAQ matches."""
+    if not bikes and not faqs:
+        return ""
+    lines = ["Retrieved context (may be incomplete):"]
+    for bike in bikes:
+        lines.append(f"- Bike: {bike['name']} by {bike['brand']} ({bike['type']}, €{bike['price_eur']})")
+    for faq in faqs:
+        lines.append(f"- FAQ: Q: {faq['question']} A: {faq['answer']}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def retrieve_context(message: str) -> Tuple[List[Dict], List[Dict]]:
+    """Product and FAQ matches for a message, searched concurrently with one shared embedding."""
+    if not vector_db.version:
+        # Not indexed yet; the tools initialize the indexes on first use
+        return [], []
+    query_vector = await asyncio.to_thread(vector_db.embed_query, message)
+    bikes, faqs = await asyncio.gather(
+        vector_db.search_bikes(message, limit=3, query_vector=query_vector),
+        vector_db.search_faq(message, limit=2, query_vector=query_vector)
+    )
+    return bikes, faqs
+
+
+def fallback_response(bikes: List[Dict]) -> str:
+    """Reply used when a turn runs out of time, with any catalog matches found so far."""
+    lines = ["Sorry, I'm taking longer than expected to answer."]
+    if bikes:
+        lines.append("In the meantime, these bikes from our catalog may match what you're looking for:")
+        lines.extend(f"- {bike['name']} by {bike['brand']} ({bike['type']}, €{bike['price_eur']})" for bike in bikes)
+    lines.append("Please try again in a moment.")
+    return "\n".join(lines)
+
+
+FAST = "fast"
+STRONG = "strong"
+
+GREETINGS = {"hi", "hello", "hey", "there", "thanks", "thank", "you", "ok", "okay", "bye", "good", "morning", "great", "cool", "yes", "no", "sure", "hallo", "danke"}
+POLICY_WORDS = {"shipping", "ship", "deliver", "delivery", "warranty", "return", "returns", "refund", "payment", "pay", "financing", "repair", "service", "store", "stores", "insurance", "test", "ride", "opening", "hours"}
+LEAD_SIGNALS = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s/-]{6,}\d|\b(?:my name is|contact me|call me|email me|reach me|i'll take|i will take)\b", re.IGNORECASE)
+CONTACT_REQUEST = re.compile(r"\b(?:e-?mail|phone|contact details|your name)\b", re.IGNORECASE)
+
+# Routing reasons whose turns start without speculative retrieval
+SKIP_RETRIEVAL_REASONS = {"greeting", "short"}
+
+route_turns = REGISTRY.counter("agent_turns_total", "Agent turns by model route")
+route_seconds = REGISTRY.histogram("agent_turn_seconds", "Agent turn latency by model route")
+route_tokens = REGISTRY.counter("agent_tokens_total", "LLM tokens by model route, model and direction")
+
+
+def route_message(message: str, history: List[Dict]) -> Tuple[str, str]:
+    """Pick the fast or strong model for a turn with cheap local heuristics; returns (route, reason).
     
-    # Use global memory instead of dependencies memory
-    if conversation_id not in GLOBAL_MEMORY:
-        GLOBAL_MEMORY[conversation_id] = []
+    Lead capture, multi-constraint product requests and long or multi-part
+    messages go to the strong model; greetings, short clarifications and
+    single policy questions go to the fast one.
+    """
+    words = re.findall(r"[\w']+", message.lower())
     
-    history = GLOBAL_MEMORY[conversation_id]
+    if LEAD_SIGNALS.search(message):
+        return STRONG, "lead_capture"
+    last_reply = next((msg['message'] for msg in reversed(history) if msg['role'] == "assistant"), "")
+    if CONTACT_REQUEST.search(last_reply):
+        # The agent asked for contact details; the answer continues the lead flow
+        return STRONG, "lead_capture"
+    if detect_interest(message) and any(word in words for word in ("buy", "purchase", "order")):
+        return STRONG, "purchase_intent"
     
-    # Build context from history
-    context_prompt = ""
-    if history:
-        context_prompt = "\nConversation history:\n"
-        for msg in history[-4:]:  # Last 4 messages
-            context_prompt += f"{msg['role']}: {msg['message']}\n"
-        context_prompt += f"\nCustomer: {message}\n\nBased on our conversation above, "
+    filters = vector_db.snapshot.query_parser.parse(message).filters if vector_db.version else {}
+    if len(filters) >= 2:
+        return STRONG, "multi_constraint"
+    if len(words) > 40 or message.count("?") > 1:
+        return STRONG, "complex"
+    
+    if words and all(word in GREETINGS for word in words):
+        return FAST, "greeting"
+    if not filters and POLICY_WORDS & set(words):
+        return FAST, "faq"
+    if len(words) <= 8 and not filters:
+        return FAST, "short"
+    return STRONG, "default"
+
+
+@lru_cache(maxsize=None)
+def _openai_model(name: str) -> Model:
+    """One model client per model name, reused across turns (recorded or replayed when a cassette is set)."""
+    return cassette_model(
+        infer_model(f'openai:{name}'),
+        settings.llm_cassette_mode,
+        settings.llm_cassette_path,
+        settings.llm_cassette_latency,
+    )
+
+
+def model_for_route(route: str) -> str:
+    """Model name for a route; without LLM_FAST_MODEL every turn uses LLM_MODEL."""
+    if route == FAST and settings.llm_fast_model:
+        return settings.llm_fast_model
+    return settings.llm_model
+
+
+def record_route_metrics(route: str, reason: str, model: str, seconds: float, usage=None):
+    """Per-route turn counts, latency and token usage, for tuning the fast/strong split."""
+    route_turns.inc(route=route, reason=reason)
+    route_seconds.observe(seconds, route=route)
+    if usage is not None:
+        route_tokens.inc(usage.input_tokens, route=route, model=model, direction="input")
+        route_tokens.inc(usage.output_tokens, route=route, model=model, direction="output")
+        # Prompt tokens served from the provider's prompt cache (OpenAI cached_tokens)
+        route_tokens.inc(usage.cache_read_tokens, route=route, model=model, direction="cached")
+
+
+# Model messages sent with a lead-capture turn that runs past the conversation budget
+LEAD_CAPTURE_HISTORY = 6
+
+WRAP_UP_RESPONSE = (
+    "We've covered a lot in this conversation! To make sure you get the best advice, "
+    "please leave your name and email, or contact our customer service team, "
+    "and a bike consultant will follow up with you personally."
+)
+
+summary_agent = Agent(
+    f'openai:{settings.llm_model}',
+    system_prompt="""Summarize this conversation between a bike shop customer and a sales consultant in at most 150 words.
+Keep the customer's needs, budget, preferences, bikes discussed, open questions and any contact details or commitments."""
+)
+
+
+def turn_limits(tokens_left: Optional[int]) -> UsageLimits:
+    """Per-turn request (tool loop) and token limits, capped by what is left of the conversation budget."""
+    token_limits = [limit for limit in (settings.turn_token_limit or None, tokens_left) if limit is not None]
+    return UsageLimits(
+        request_limit=settings.turn_request_limit or None,
+        total_tokens_limit=max(1, min(token_limits)) if token_limits else None
+    )
+
+
+async def summarize_history(memory: List[Dict], messages: List[ModelMessage], usage: RunUsage) -> List[ModelMessage]:
+    """Replace a long history with the system prompt plus a summary, using the fast model."""
+    transcript = "\n".join(f"{msg['role']}: {msg['message']}" for msg in memory[:-1])
+    result = await run_with_deadline(summary_agent.run(transcript, model=_openai_model(model_for_route(FAST)), usage=usage))
+    system_parts = [part for part in messages[0].parts if isinstance(part, SystemPromptPart)]
+    return [ModelRequest(parts=system_parts + [SystemPromptPart(f"Summary of the conversation so far:\n{result.output}")])]
+
+
+# Serializes turns per conversation so history reads and appends never interleave
+CONVERSATION_LOCKS = ConversationLocks()
+
+# Conversations held in memory by open WebSocket connections
+SESSIONS: Dict[str, ChatSession] = {}
+sessions_open = REGISTRY.gauge("chat_sessions_open", "Conversations held in memory by WebSocket sessions", lambda: len(SESSIONS))
+
+
+async def open_session(conversation_id: str) -> ChatSession:
+    """Attach a connection to the conversation's session, loading it from the store if needed."""
+    session = SESSIONS.get(conversation_id)
+    if session is None:
+        dependencies = await asyncio.to_thread(SalesAgentDependencies)
+        session = SESSIONS.get(conversation_id)
+        if session is None:
+            session = SESSIONS[conversation_id] = ChatSession(
+                conversation_id,
+                dependencies=dependencies,
+                messages=list(MESSAGE_HISTORY.get(conversation_id, [])),
+                memory=list(GLOBAL_MEMORY.get(conversation_id, []))
+            )
+        else:
+            await dependencies.http_client.aclose()
+    session.connections += 1
+    return session
+
+
+def flush_session(session: ChatSession):
+    """Write the session's history back to the conversation store."""
+    if not session.dirty:
+        return
+    if session.messages:
+        MESSAGE_HISTORY[session.conversation_id] = list(session.messages)
+    GLOBAL_MEMORY[session.conversation_id] = list(session.memory)
+    session.dirty = False
+
+
+async def close_session(session: ChatSession):
+    """Detach a connection; the last one flushes the session and releases its dependencies."""
+    session.connections -= 1
+    flush_session(session)
+    if session.connections <= 0 and SESSIONS.get(session.conversation_id) is session:
+        del SESSIONS[session.conversation_id]
+        await session.dependencies.http_client.aclose()
+
+
+def stream_events(send: Callable[[Dict], Awaitable[None]]):
+    """Agent event handler forwarding text deltas and tool calls and results to send()."""
+    async def handler(ctx: RunContext[SalesAgentDependencies], events: AsyncIterable[AgentStreamEvent]):
+        async for event in events:
+            if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+                if event.part.content:
+                    await send({"type": "token", "text": event.part.content})
+            elif isinstance(event, PartDeltaEvent) and isinstance(event.delta, TextPartDelta):
+                await send({"type": "token", "text": event.delta.content_delta})
+            elif isinstance(event, FunctionToolCallEvent):
+                await send({
+                    "type": "tool_call",
+                    "tool": event.part.tool_name,
+                    "args": event.part.args_as_dict(),
+                    "tool_call_id": event.tool_call_id
+                })
+            elif isinstance(event, FunctionToolResultEvent):
+                await send({"type": "tool_result", "tool": event.result.tool_name, "tool_call_id": event.tool_call_id})
+    return handler
+
+
+# Chat function for API
+async def chat_with_sales_agent(
+    message: str,
+    conversation_id: str,
+    session: Optional[ChatSession] = None,
+    on_event: Optional[Callable[[Dict], Awaitable[None]]] = None,
+    admit: Optional[Callable[[], AsyncContextManager]] = None
+) -> str:
+    """Chat with the sales agent, one turn at a time per conversation.
+
+    With on_event, the turn streams its text deltas and tool events to it.
+    admit() (e.g. an admission control slot) is entered only around the
+    agent run itself, once the conversation's lock is held, so messages
+    waiting for a busy conversation don't hold a run slot.
+    """
+    async def turn(text: str) -> str:
+        if admit is None:
+            return await _run_turn(text, conversation_id, session, on_event)
+        async with admit():
+            return await _run_turn(text, conversation_id, session, on_event)
+
+    return await CONVERSATION_LOCKS.run(
+        conversation_id,
+        message,
+        turn,
+        timeout=remaining(settings.conversation_lock_timeout),
+        coalesce=settings.coalesce_messages and on_event is None
+    )
+
+
+async def _run_turn(
+    message: str,
+    conversation_id: str,
+    session: Optional[ChatSession] = None,
+    on_event: Optional[Callable[[Dict], Awaitable[None]]] = None
+) -> str:
+    """Run one agent turn and record it in the conversation's session or the store."""
+    # Turns of a conversation with an open session use its hot state, whichever transport they come from
+    session = session or SESSIONS.get(conversation_id)
+    # Use global memory instead of dependencies memory
+    history = session.memory if session is not None else GLOBAL_MEMORY.setdefault(conversation_id, [])
+    route, reason = route_message(message, history)
+    # Retrieval overlaps with loading the dependencies and is dropped if it is slow;
+    # greetings and short clarifications don't need it
+    retrieval = None
+    if settings.speculative_retrieval and reason not in SKIP_RETRIEVAL_REASONS:
+        retrieval = asyncio.create_task(retrieve_context(message))
+    if session is not None:
+        dependencies = session.dependencies
+        message_history = session.messages
+        session.dirty = True
+    else:
+        dependencies = await asyncio.to_thread(SalesAgentDependencies)
+        message_history = MESSAGE_HISTORY.get(conversation_id, [])
+    bikes, faqs = [], []
+    if retrieval is not None:
+        try:
+            bikes, faqs = await asyncio.wait_for(retrieval, remaining(settings.speculative_retrieval_timeout))
+        except Exception as e:
+            print(f"Speculative retrieval skipped: {e!r}")
     
     # Add user message to memory
-    GLOBAL_MEMORY[conversation_id].append({
+    user_entry = {
         "role": "user",
         "message": message,
         "timestamp": "now"
-    })
+    }
+    history.append(user_entry)
+    stored_messages = message_history
     
-    # Run agent with context
-    full_message = context_prompt + message if context_prompt else message
-    result = await sales_agent.run(full_message, deps=dependencies)
+    # Run agent with context; the run (and its tool calls) is cancelled at the request deadline
+    # Per-turn content goes last: the request starts with the cached prefix of earlier turns
+    full_message = format_retrieved_context(bikes, faqs) + message
+    model = model_for_route(route)
+    started = time.perf_counter()
+    turn_usage = RunUsage()
+    budget = settings.conversation_token_budget
+    spent = usage_tracker.conversation_tokens(conversation_id)
+    tokens_left = budget - spent if budget else None
+    # Past the budget, a message with contact details still gets a small allowance so the lead is captured
+    lead_capture = (
+        budget and spent >= budget and LEAD_SIGNALS.search(message) is not None
+        and spent < budget + settings.lead_capture_allowance
+    )
+    try:
+        if budget and spent >= budget and not lead_capture:
+            usage_tracker.budget_event("wrap_up")
+            output = WRAP_UP_RESPONSE
+        else:
+            prompt_history = message_history
+            if lead_capture:
+                usage_tracker.budget_event("lead_capture")
+                tokens_left = budget + settings.lead_capture_allowance - spent
+                # Only the latest turns, so the allowance covers the lead rather than the whole history
+                prompt_history = trim_history(message_history, LEAD_CAPTURE_HISTORY, keep=LEAD_CAPTURE_HISTORY)
+            elif (budget and spent >= budget * settings.summarize_at
+                    and len(message_history) >= settings.summary_min_messages):
+                usage_tracker.budget_event("summarize")
+                message_history = prompt_history = await summarize_history(history, message_history, turn_usage)
+                _save_messages(conversation_id, session, message_history)
+            
+            result = await run_with_deadline(sales_agent.run(
+                full_message,
+                deps=dependencies,
+                model=_openai_model(model),
+                message_history=prompt_history or None,
+                usage=turn_usage,
+                usage_limits=turn_limits(tokens_left),
+                event_stream_handler=stream_events(on_event) if on_event else None
+            ))
+            output = result.output
+            # Stored exactly as sent (retrieved context included), so the next request extends this
+            # one and hits the prompt cache; coarse trimming bounds what the context blocks add up to
+            _save_messages(conversation_id, session, trim_history(
+                message_history + result.new_messages(), settings.history_max_messages
+            ))
+    except DeadlineExceeded:
+        print(f"Agent turn for conversation {conversation_id} hit its deadline")
+        output = fallback_response(bikes)
+    except UsageLimitExceeded as e:
+        # Runaway tool loops or an exhausted budget end the turn instead of burning more tokens
+        print(f"Agent turn for conversation {conversation_id} stopped: {e}")
+        usage_tracker.budget_event("turn_limit")
+        output = WRAP_UP_RESPONSE
+    except asyncio.CancelledError:
+        # The client went away: roll the turn back so history has no unanswered message
+        if history and history[-1] is user_entry:
+            history.pop()
+        _save_messages(conversation_id, session, stored_messages)
+        raise
+    finally:
+        if session is None:
+            await dependencies.http_client.aclose()
+        usage_tracker.record(conversation_id, turn_usage)
+    record_route_metrics(route, reason, model, time.perf_counter() - started, turn_usage)
     
     # Add agent response to memory
-    GLOBAL_MEMORY[conversation_id].append({
+    history.append({
         "role": "assistant", 
-        "message": result.output,
+        "message": output,
         "timestamp": "now"
     })
+    if session is not None and SESSIONS.get(conversation_id) is not session:
+        # The session closed while this turn ran; don't lose the turn
+        flush_session(session)
     
-    return result.output
+    return output
+
+
+def _save_messages(conversation_id: str, session: Optional[ChatSession], messages: List[ModelMessage]):
+    if session is not None:
+        session.messages = messages
+    else:
+        MESSAGE_HISTORY[conversation_id] = messages
 
 
 def detect_interest(message: str) -> bool:
@@ -1,15 +1,50 @@
 """FastAPI application for bike sales agent."""
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .models import ChatRequest, ChatResponse
-from .agent import chat_with_sales_agent, detect_interest
-from .dependencies import SalesAgentDependencies
+from starlette.requests import HTTPConnection
+from .models import ChatRequest, ChatResponse, UsageReport
+from .agent import chat_with_sales_agent, close_session, detect_interest, flush_session, open_session
+from .conversations import ChatSession, ConversationBusy
+from .admission import Overloaded, admission
+from .batch import run_batch
+from .metrics import REGISTRY
+from .usage import usage_tracker
+from .deadlines import deadline
+from .vector_db import vector_db
+from .faq import load_faq
+from .catalog_index import InvalidQuery, get_catalog_index
+from .static_responses import cache_headers, etag_matches, prepared_response
+from .reload import watch_for_changes
+from .settings import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load search indexes at boot (a prebuilt artifact when INDEX_ARTIFACT_PATH is set)."""
+    await vector_db.initialize()
+    
+    watcher = None
+    if settings.reload_poll_seconds > 0:
+        watcher = asyncio.create_task(watch_for_changes(vector_db, settings.reload_poll_seconds))
+    yield
+    
+    if watcher:
+        watcher.cancel()
+
 
 app = FastAPI(
     title="Bike Sales Agent API",
     description="PydanticAI-powered bike sales consultant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -27,17 +62,73 @@ async def health_check():
     return {"status": "healthy", "service": "bike_sales_agent", "version": "1.0.0"}
 
 
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the response was ready."""
+
+
+async def _unless_disconnected(http_request: Request, awaitable):
+    """Await the work, cancelling it as soon as the client disconnects."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=0.5)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _client_key(http_request: HTTPConnection, conversation_id: str) -> str:
+    """Identity used for per-client fairness in admission control."""
+    if settings.admission_client_key != "ip":
+        return f"conversation:{conversation_id}"
+    host = http_request.client.host if http_request.client else "unknown"
+    trusted = {proxy.strip() for proxy in settings.trusted_proxies.split(",") if proxy.strip()}
+    forwarded = http_request.headers.get("x-forwarded-for")
+    if host in trusted and forwarded:
+        # Rightmost address not added by one of our own proxies
+        for address in reversed([part.strip() for part in forwarded.split(",") if part.strip()]):
+            host = address
+            if address not in trusted:
+                break
+    return f"ip:{host}"
+
+
+def _require_admin(x_admin_token: Optional[str], feature: str):
+    """403 unless ADMIN_TOKEN is set and matches the header (compared in constant time)."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail=f"{feature} is disabled until ADMIN_TOKEN is set")
+    if not hmac.compare_digest((x_admin_token or "").encode("utf-8"), settings.admin_token.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _usage_report(conversation_id: str) -> UsageReport:
+    return UsageReport(
+        turn=usage_tracker.last_turn(conversation_id),
+        conversation=usage_tracker.conversation(conversation_id),
+        conversation_budget=settings.conversation_token_budget or None
+    )
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(request: ChatRequest):
+async def chat_with_agent(request: ChatRequest, http_request: Request):
     """Chat with the bike sales agent."""
     try:
-        # Check if dependencies are available
-        deps = SalesAgentDependencies()
-        if not deps.bike_catalog:
+        # The indexed catalog is what the agent searches; don't run turns without it
+        if not vector_db.ready:
             raise HTTPException(status_code=503, detail="Service dependencies not initialized")
         
-        # Run the agent
-        response = await chat_with_sales_agent(request.message, request.conversation_id)
+        # Run the agent once the conversation is free and admitted; sheds load with 429/503
+        # instead of queueing without bound. The deadline covers both waits, the agent run,
+        # its tool calls and searches.
+        with deadline(settings.request_timeout):
+            client = _client_key(http_request, request.conversation_id)
+            response = await _unless_disconnected(http_request, chat_with_sales_agent(
+                request.message, request.conversation_id, admit=lambda: admission.slot(client)
+            ))
         
         # Detect interest
         interest_detected = detect_interest(request.message)
@@ -45,22 +136,236 @@ async def chat_with_agent(request: ChatRequest):
         return ChatResponse(
             response=response,
             conversation_id=request.conversation_id,
-            interest_detected=interest_detected
+            interest_detected=interest_detected,
+            usage=_usage_report(request.conversation_id) if request.include_usage else None
         )
     
+    except HTTPException:
+        raise
+    except ClientDisconnected:
+        return Response(status_code=499)
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+    except ConversationBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
 
+async def _read_limited(http_request: Request, max_bytes: int) -> bytes:
+    """Request body, or 413 as soon as it is known to exceed max_bytes (0 = no limit)."""
+    if max_bytes:
+        try:
+            declared = int(http_request.headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length")
+        if declared > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body is larger than {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in http_request.stream():
+        body.extend(chunk)
+        if max_bytes and len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body is larger than {max_bytes} bytes")
+    return bytes(body)
+
+
+@app.post("/chat/batch")
+async def chat_batch(
+    http_request: Request,
+    concurrency: Optional[int] = Query(default=None, ge=1),
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """Run chat turns for a JSONL body, streaming JSONL results and a final summary line.
+    
+    Requires ADMIN_TOKEN. Turns run with at most BATCH_MAX_CONCURRENCY in flight
+    and take run slots only when interactive requests are not waiting for them.
+    """
+    _require_admin(x_admin_token, "Batch chat")
+    
+    limit = min(concurrency or settings.batch_concurrency, settings.batch_max_concurrency)
+    # Read the input up front: while a streaming response is sent, the server's
+    # receive channel is used to watch for the client disconnecting
+    lines = (await _read_limited(http_request, settings.batch_max_body_bytes)).decode("utf-8").splitlines()
+    
+    async def body():
+        async for result in run_batch(lines, limit, timeout=settings.request_timeout, max_items=settings.batch_max_items):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.websocket("/ws/chat/{conversation_id}")
+async def chat_websocket(websocket: WebSocket, conversation_id: str):
+    """Chat over a WebSocket bound to one conversation.
+    
+    The conversation's history and dependencies stay in memory while the
+    socket is open and are written back to the store when it goes idle or
+    closes. Each message (plain text or {"message": ..., "include_usage": ...})
+    streams "token", "tool_call" and "tool_result" events, then a "response"
+    event shaped like the /chat response, or an "error" event.
+    """
+    await websocket.accept()
+    session = await open_session(conversation_id)
+    client = _client_key(websocket, conversation_id)
+    last_activity = time.monotonic()
+    try:
+        await websocket.send_json({"type": "session", "conversation_id": conversation_id})
+        while True:
+            # Wake up to flush after a short idle period, and to close after a long one
+            timeouts = []
+            if session.dirty:
+                timeouts.append(settings.ws_flush_idle_seconds)
+            if settings.ws_idle_timeout > 0:
+                timeouts.append(max(0.0, settings.ws_idle_timeout - (time.monotonic() - last_activity)))
+            try:
+                text = await asyncio.wait_for(websocket.receive_text(), min(timeouts) if timeouts else None)
+            except asyncio.TimeoutError:
+                flush_session(session)
+                if settings.ws_idle_timeout > 0 and time.monotonic() - last_activity >= settings.ws_idle_timeout:
+                    await websocket.close(code=1000, reason="Idle timeout")
+                    break
+                continue
+            await websocket.send_json(await _websocket_turn(websocket, session, client, text))
+            last_activity = time.monotonic()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await close_session(session)
+
+
+async def _websocket_turn(websocket: WebSocket, session: ChatSession, client: str, text: str) -> Dict:
+    """Run one streamed turn and return the final event for it."""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        payload = text
+    if isinstance(payload, dict):
+        message = str(payload.get("message") or "")
+        include_usage = bool(payload.get("include_usage"))
+    else:
+        message, include_usage = text, False
+    if not message.strip():
+        return {"type": "error", "status": 422, "detail": "Empty message"}
+    
+    try:
+        with deadline(settings.request_timeout):
+            response = await chat_with_sales_agent(
+                message, session.conversation_id, session=session, on_event=websocket.send_json,
+                admit=lambda: admission.slot(client)
+            )
+    except WebSocketDisconnect:
+        raise
+    except Overloaded as e:
+        return {"type": "error", "status": e.status_code, "detail": e.reason, "retry_after": e.retry_after}
+    except ConversationBusy as e:
+        return {"type": "error", "status": 429, "detail": str(e), "retry_after": 5}
+    except Exception as e:
+        return {"type": "error", "status": 500, "detail": f"Agent error: {str(e)}"}
+    
+    result = ChatResponse(
+        response=response,
+        conversation_id=session.conversation_id,
+        interest_detected=detect_interest(message),
+        usage=_usage_report(session.conversation_id) if include_usage else None
+    )
+    return {"type": "response", **result.model_dump()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/bikes")
-async def list_bikes():
-    """List all available bikes."""
-    deps = SalesAgentDependencies()
-    return {"bikes": deps.bike_catalog}
+async def list_bikes(
+    type: Optional[str] = Query(default=None, description="Bike type(s), comma-separated"),
+    brand: Optional[str] = Query(default=None, description="Brand(s), comma-separated"),
+    price_min: Optional[float] = Query(default=None, ge=0),
+    price_max: Optional[float] = Query(default=None, ge=0),
+    wheel_size: Optional[float] = Query(default=None),
+    sort: str = Query(default="id", description="id, price_asc, price_desc or name"),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
+    accept_encoding: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """List bikes, optionally filtered, sorted and paginated."""
+    index = get_catalog_index()
+    filters = (type, brand, wheel_size, price_min, price_max)
+    
+    if all(value is None for value in filters + (limit, cursor)) and sort == "id":
+        full = prepared_response("bikes", lambda: index.page(index.all_positions))
+        return full.respond(accept_encoding, if_none_match)
+    
+    etag = f'"{index.etag}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    try:
+        body = index.page(index.candidates(*filters), sort, limit, cursor)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+
+@app.get("/bikes/facets")
+async def bike_facets(
+    type: Optional[str] = Query(default=None),
+    brand: Optional[str] = Query(default=None),
+    price_min: Optional[float] = Query(default=None, ge=0),
+    price_max: Optional[float] = Query(default=None, ge=0),
+    wheel_size: Optional[float] = Query(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """Counts per type, brand and wheel size, plus the price range, for the (filtered) catalog."""
+    index = get_catalog_index()
+    filters = (type, brand, wheel_size, price_min, price_max)
+    
+    if all(value is None for value in filters):
+        return prepared_response("bikes_facets", lambda: index.facets_body).respond(accept_encoding, if_none_match)
+    
+    etag = f'"{index.etag}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    body = json.dumps(index.facets(index.candidates(*filters))).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+
+def _render_faq() -> bytes:
+    """Structured FAQ entries of the active index version."""
+    try:
+        entries = vector_db.faq or load_faq()
+    except Exception:
+        entries = []
+    return json.dumps({"faq": entries}, ensure_ascii=False).encode("utf-8")
 
 
 @app.get("/faq")
-async def get_faq():
-    """Get FAQ information."""
-    deps = SalesAgentDependencies()
-    return {"faq": deps.faq_data}
\ No newline at end of file
+async def get_faq(
+    accept_encoding: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """Get FAQ entries."""
+    return prepared_response("faq", _render_faq).respond(accept_encoding, if_none_match)
+
+
+@app.get("/faq/search")
+async def search_faq(
+    q: str = Query(min_length=1, max_length=500),
+    limit: int = Query(default=3, ge=1, le=20)
+):
+    """Semantic FAQ search for help widgets, without invoking the agent."""
+    results = await vector_db.search_faq(q, limit=limit)
+    return {"query": q, "results": results}
+
+
+@app.post("/admin/reload")
+async def reload_indexes(x_admin_token: Optional[str] = Header(default=None)):
+    """Rebuild catalog and FAQ indexes and swap them in without a restart (requires ADMIN_TOKEN)."""
+    _require_admin(x_admin_token, "Index reload")
+    
+    reloaded = await vector_db.reload()
+    if not reloaded:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version {vector_db.version}")
+    return {"reloaded": True, "version": vector_db.version, "bikes": len(vector_db.bikes)}
@@ -0,0 +1,174 @@
+"""Batch chat runs over JSONL input for offline evaluation and bulk processing.
+
+Each input line is a JSON object with the message under "message" (or
+"question", "prompt" or "body"), and optionally an "id" and a
+"conversation_id". Lines without a conversation_id get their own
+conversation; lines sharing one run as consecutive turns of it. Results are
+yielded as JSONL-ready dicts in completion order, followed by a summary.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
+
+from .admission import admission
+from .agent import chat_with_sales_agent, detect_interest
+from .deadlines import deadline
+from .usage import usage_tracker
+from .vector_db import SharedSearchResults, share_search_results
+
+MESSAGE_FIELDS = ("message", "question", "prompt", "body")
+
+
+def parse_item(line: str) -> Dict:
+    """Decode one input line; raises ValueError for lines without a message."""
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("Expected a JSON object")
+    message = next((item[name] for name in MESSAGE_FIELDS if isinstance(item.get(name), str) and item[name].strip()), None)
+    if message is None:
+        raise ValueError(f"No message in any of the fields: {', '.join(MESSAGE_FIELDS)}")
+    return {**item, "message": message}
+
+
+class BatchStats:
+    """Counts and latencies of one batch run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.items = 0
+        self.errors = 0
+        self.latencies: List[float] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def summary(self, shared: SharedSearchResults) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": round(self.items / elapsed, 3) if elapsed > 0 else 0.0,
+            "p50_seconds": round(statistics.median(latencies), 3) if latencies else 0.0,
+            "p95_seconds": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3) if latencies else 0.0,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "shared_search_hits": shared.hits,
+            "shared_search_misses": shared.misses,
+        }
+
+
+@asynccontextmanager
+async def _batch_run(timeout: Optional[float]):
+    """A batch run slot; the item's deadline starts once the slot is free."""
+    async with admission.batch_slot():
+        with deadline(timeout):
+            yield
+
+
+async def _run_item(
+    index: int, line: str, batch_id: str, timeout: Optional[float], stats: BatchStats, shared: SharedSearchResults
+) -> Dict:
+    share_search_results(shared)
+    result: Dict = {"index": index}
+    started = time.perf_counter()
+    try:
+        item = parse_item(line)
+        if "id" in item:
+            result["id"] = item["id"]
+        conversation_id = str(item.get("conversation_id") or f"batch-{batch_id}-{index}")
+        result["conversation_id"] = conversation_id
+        # Counts against the same run capacity as /chat, taken once the conversation is free
+        response = await chat_with_sales_agent(
+            item["message"], conversation_id, admit=lambda: _batch_run(timeout)
+        )
+        turn = usage_tracker.last_turn(conversation_id)
+        result.update(
+            response=response,
+            interest_detected=detect_interest(item["message"]),
+            seconds=round(time.perf_counter() - started, 3),
+            usage=turn.model_dump()
+        )
+        stats.latencies.append(time.perf_counter() - started)
+        stats.input_tokens += turn.input_tokens
+        stats.output_tokens += turn.output_tokens
+    except Exception as e:
+        stats.errors += 1
+        result["error"] = f"{type(e).__name__}: {e}"
+    stats.items += 1
+    return result
+
+
+async def _aiter(lines: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    if hasattr(lines, "__aiter__"):
+        async for line in lines:
+            yield line
+    else:
+        for line in lines:
+            yield line
+
+
+async def run_batch(
+    lines: Union[Iterable[str], AsyncIterable[str]],
+    concurrency: int,
+    timeout: Optional[float] = None,
+    max_items: int = 0
+) -> AsyncIterator[Dict]:
+    """Run chat turns for JSONL lines with at most `concurrency` in flight.
+
+    Input is read only as fast as slots free up, so large files are never held
+    in memory. Each turn also takes a batch run slot from admission control,
+    so batches only use capacity interactive requests leave free. Items share one set of search results (and the process-wide
+    query embedding cache). Yields one result per item, then {"summary": ...}.
+    """
+    batch_id = uuid.uuid4().hex[:8]
+    stats = BatchStats()
+    shared = SharedSearchResults()
+    results: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    tasks = set()
+
+    async def run(index: int, line: str):
+        try:
+            await results.put(await _run_item(index, line, batch_id, timeout, stats, shared))
+        finally:
+            slots.release()
+
+    async def feed():
+        index = 0
+        try:
+            async for line in _aiter(lines):
+                if not line.strip():
+                    continue
+                if max_items and index >= max_items:
+                    await results.put({"index": index, "error": f"Batch limit of {max_items} items reached"})
+                    break
+                await slots.acquire()
+                task = asyncio.create_task(run(index, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+            if tasks:
+                await asyncio.gather(*list(tasks))
+        finally:
+            await results.put(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield result
+        await feeder
+        yield {"summary": stats.summary(shared)}
+    finally:
+        # The consumer went away (e.g. the HTTP client disconnected): stop the remaining work
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
@@ -0,0 +1,125 @@
+"""Process-pool encoding for bulk (re)indexing of large catalogs.
+
+Usage: python -m src.bulk_index [--workers 4] [--chunk-size 256] [--catalog path]
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Any, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from .settings import settings
+
+
+_worker_encoder = None
+
+
+def _init_worker(nice: int, threads: int):
+    """Load the encoder once per worker process, at lower scheduling priority."""
+    global _worker_encoder
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    settings.encoder_threads = threads
+
+    from .encoders import create_encoder
+    _worker_encoder = create_encoder()
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    """Encode one chunk in a worker process."""
+    return np.asarray(_worker_encoder.encode(texts), dtype=np.float32)
+
+
+@dataclass
+class BulkIndexStats:
+    """Throughput of a bulk encoding run."""
+    records: int = 0
+    seconds: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.records} records in {self.seconds:.1f}s ({self.records_per_second:.0f} records/sec)"
+
+
+def encode_parallel(
+    chunks: Iterable[Tuple[Any, List[str]]],
+    workers: int,
+    stats: BulkIndexStats = None
+) -> Iterator[Tuple[Any, np.ndarray]]:
+    """Encode (context, texts) chunks in a process pool, yielding (context, vectors) in input order.
+
+    Chunks are pulled from the iterable lazily and at most two per worker
+    are in flight, so memory stays bounded regardless of catalog size.
+    """
+    stats = stats if stats is not None else BulkIndexStats()
+    started = time.perf_counter()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    chunks = iter(chunks)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(settings.index_worker_nice, threads)
+    ) as executor:
+        pending = deque()
+
+        def submit_next() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            context, texts = chunk
+            pending.append((context, executor.submit(_encode_chunk, list(texts))))
+            return True
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            context, future = pending.popleft()
+            vectors = future.result()
+            submit_next()
+            stats.records += len(vectors)
+            stats.seconds = time.perf_counter() - started
+            yield context, vectors
+
+
+def main():
+    """Rebuild the catalog and FAQ vectors with a process pool and persist them."""
+    parser = argparse.ArgumentParser(description="Bulk re-index the bike catalog and FAQ")
+    parser.add_argument("--workers", type=int, default=settings.index_workers or os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=settings.index_chunk_size)
+    parser.add_argument("--catalog", default=settings.catalog_path, help="JSON array or JSON Lines product feed")
+    args = parser.parse_args()
+
+    # Persisted NumPy collections are what API workers can pick up without re-encoding
+    settings.vector_backend = "numpy"
+    settings.vector_mmap = True
+    settings.index_workers = args.workers
+    settings.index_chunk_size = args.chunk_size
+    settings.catalog_path = args.catalog
+    settings.bulk_index_min_records = 0
+
+    import asyncio
+    from .vector_db import VectorDB
+
+    vector_db = VectorDB()
+    asyncio.run(vector_db.initialize())
+    print(f"Vectors written to {settings.vector_db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Record and replay LLM calls so the agent pipeline can run offline and reproducibly.
+
+In record mode every model request goes to the real model and the request,
+response (including tool calls) and latency are appended to a JSONL cassette.
+In replay mode the same requests are answered from the cassette after a
+simulated latency; tools, vector search, memory and the API still run for
+real. Requests are matched on their content, ignoring timestamps, usage and
+provider metadata, so a replay reproduces the recorded conversations as long
+as the prompts, tools and data are unchanged.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+
+# Fields that change between otherwise identical requests
+VOLATILE_KEYS = {
+    "timestamp", "usage", "model_name", "provider_name", "provider_details",
+    "provider_response_id", "finish_reason", "vendor_id", "vendor_details",
+}
+
+STREAM_CHUNK_WORDS = 4
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _strip(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    return value
+
+
+def request_key(messages: List[ModelMessage], tool_names: List[str]) -> str:
+    """Content hash of a model request: the message history plus the tools offered."""
+    payload = {
+        "messages": _strip(ModelMessagesTypeAdapter.dump_python(messages, mode="json")),
+        "tools": sorted(tool_names),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _tool_names(model_request_parameters: ModelRequestParameters) -> List[str]:
+    tools = list(model_request_parameters.function_tools) + list(model_request_parameters.output_tools)
+    return [tool.name for tool in tools]
+
+
+def _last_prompt(messages: List[ModelMessage]) -> str:
+    """Human-readable hint of what a recorded request was about."""
+    for message in reversed(messages):
+        for part in reversed(message.parts):
+            if getattr(part, "part_kind", None) in ("user-prompt", "tool-return"):
+                content = part.content if isinstance(part.content, str) else str(part.content)
+                return content[-200:]
+    return ""
+
+
+class Cassette:
+    """Recorded responses by request key, loaded from and appended to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, List[Dict]] = {}
+        self._replayed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, key: str, messages: List[ModelMessage], response: ModelResponse, latency: float):
+        entry = {
+            "key": key,
+            "prompt": _last_prompt(messages),
+            "response": ModelMessagesTypeAdapter.dump_python([response], mode="json")[0],
+            "latency": round(latency, 4),
+        }
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def lookup(self, key: str, messages: List[ModelMessage]) -> Dict:
+        """Next recorded entry for the key; repeated requests cycle through the recordings."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded response for request ending in: {_last_prompt(messages)[:80]!r}")
+            count = self._replayed.get(key, 0)
+            self._replayed[key] = count + 1
+            return entries[count % len(entries)]
+
+
+def _load_response(entry: Dict) -> ModelResponse:
+    return ModelMessagesTypeAdapter.validate_python([entry["response"]])[0]
+
+
+class CassetteModel(WrapperModel):
+    """Wraps the real model to record its responses, or to replay them without calling it.
+
+    In replay mode the wrapped model is only used for its name, profile and
+    request customization, so requests are built exactly as when recording.
+    """
+
+    def __init__(self, wrapped: Model, cassette: Cassette, mode: str, latency: Optional[float] = None):
+        super().__init__(wrapped)
+        self.cassette = cassette
+        self.mode = mode
+        # None replays the recorded latency; a number replaces it
+        self.latency = latency
+        self._streamer = FunctionModel(stream_function=self._replay_stream, model_name=wrapped.model_name)
+
+    def _latency(self, entry: Dict) -> float:
+        return entry["latency"] if self.latency is None else self.latency
+
+    async def request(self, messages, model_settings, model_request_parameters) -> ModelResponse:
+        key = request_key(messages, _tool_names(model_request_parameters))
+        if self.mode == "replay":
+            entry = self.cassette.lookup(key, messages)
+            await asyncio.sleep(self._latency(entry))
+            return _load_response(entry)
+
+        started = time.perf_counter()
+        response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self.cassette.record(key, messages, response, time.perf_counter() - started)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self, messages, model_settings, model_request_parameters, run_context=None
+    ) -> AsyncIterator[StreamedResponse]:
+        if self.mode == "replay":
+            async with self._streamer.request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as stream:
+                yield stream
+            return
+
+        key = request_key(messages, _tool_names(model_request_parameters))
+        started = time.perf_counter()
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        self.cassette.record(key, messages, stream.get(), time.perf_counter() - started)
+
+    async def _replay_stream(self, messages: List[ModelMessage], info: AgentInfo):
+        """Replay a recorded response as chunks, spreading the latency across them."""
+        tools = [tool.name for tool in info.function_tools + info.output_tools]
+        entry = self.cassette.lookup(request_key(messages, tools), messages)
+        response = _load_response(entry)
+
+        chunks = []
+        for index, part in enumerate(response.parts):
+            if isinstance(part, TextPart):
+                words = part.content.split(" ")
+                for i in range(0, len(words), STREAM_CHUNK_WORDS):
+                    text = " ".join(words[i:i + STREAM_CHUNK_WORDS])
+                    chunks.append(text if i == 0 else " " + text)
+            elif isinstance(part, ToolCallPart):
+                chunks.append({index: DeltaToolCall(part.tool_name, part.args_as_json_str(), tool_call_id=part.tool_call_id)})
+
+        delay = self._latency(entry) / max(1, len(chunks))
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+
+_cassettes: Dict[str, Cassette] = {}
+
+
+def cassette_model(model: Model, mode: str, path: str, latency: float = -1) -> Model:
+    """Wrap a model for recording or replay; mode 'off' returns it unchanged."""
+    if mode not in ("record", "replay"):
+        return model
+    cassette = _cassettes.get(path)
+    if cassette is None:
+        cassette = _cassettes[path] = Cassette(path)
+        print(f"LLM cassette {mode}: {path} ({len(cassette)} recorded responses)")
+    return CassetteModel(model, cassette, mode, latency=None if latency < 0 else latency)
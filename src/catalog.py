@@ -0,0 +1,171 @@
+"""Streaming catalog ingestion: JSON arrays or JSON Lines, validated record by record."""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, TextIO
+
+from pydantic import ValidationError
+
+from .models import Bike
+from .settings import settings
+
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Data", "product_catalog.json")
+
+
+# Characters that end a JSON number or literal inside an array
+DELIMITER = re.compile(r"[\s,\]]")
+
+
+def catalog_path() -> str:
+    """Configured catalog feed, defaulting to Data/product_catalog.json."""
+    return settings.catalog_path or DEFAULT_CATALOG_PATH
+
+
+@dataclass
+class IngestReport:
+    """Accepted/rejected counts and the first errors of an ingestion run."""
+    accepted: int = 0
+    rejected: int = 0
+    errors: List[str] = field(default_factory=list)
+    max_errors: int = 50
+    # False when the feed could not be read to its end
+    complete: bool = True
+
+    def reject(self, where: str, message: str):
+        """Record a malformed record without aborting the run."""
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(f"{where}: {message}")
+
+    def stop(self, where: str, message: str):
+        """Record an error that ends the feed early; records after it are lost."""
+        self.reject(where, message)
+        self.complete = False
+
+    def __str__(self) -> str:
+        return f"{self.accepted} accepted, {self.rejected} rejected"
+
+
+def iter_json_array(f: TextIO, report: IngestReport, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array, reading the file in chunks.
+
+    An element that fails to decode cannot be skipped inside an array, so it
+    is reported and ends the stream; records before it are kept. A missing,
+    doubled or trailing comma between elements (``[1 2]``, ``[1,,2]``,
+    ``[1,]``) raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    # Characters dropped from the buffer so far, for offsets in error messages
+    consumed = 0
+
+    def read_more() -> bool:
+        nonlocal buffer, position, eof, consumed
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        # Drop what has been consumed so the buffer only holds the current element
+        consumed += position
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def next_char() -> str:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not read_more():
+                return ""
+
+    if next_char() != "[":
+        raise ValueError("Catalog must be a JSON array")
+    position += 1
+
+    # Elements must alternate with commas: a value is expected first, and after every comma
+    expect_value = True
+    first = True
+    while True:
+        char = next_char()
+        if char == "":
+            report.stop("end of file", "unterminated JSON array")
+            return
+        if char == "]":
+            if expect_value and not first:
+                raise ValueError(f"Trailing comma in JSON array at offset {consumed + position}")
+            return
+        if char == ",":
+            if expect_value:
+                raise ValueError(f"Unexpected comma in JSON array at offset {consumed + position}")
+            position += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise ValueError(f"Missing comma in JSON array at offset {consumed + position}")
+        if char not in '"[{' and not eof and not DELIMITER.search(buffer, position):
+            # A number or literal may continue in the next chunk ("0." | "1"): read up to its end first
+            read_more()
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            if read_more():
+                continue
+            report.stop(f"element after offset {consumed + e.pos}", f"invalid JSON ({e.msg}), stopping")
+            return
+        position = end
+        expect_value = first = False
+        yield value
+
+
+def iter_json_lines(f: TextIO, report: IngestReport) -> Iterator[Any]:
+    """Yield one JSON value per non-empty line; malformed lines are reported and skipped."""
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            report.reject(f"line {line_number}", f"invalid JSON ({e.msg})")
+
+
+def iter_bikes(path: str = None, report: IngestReport = None) -> Iterator[Dict]:
+    """Stream validated bike records from a JSON array or JSON Lines feed."""
+    path = path or catalog_path()
+    report = report if report is not None else IngestReport()
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            records = iter_json_lines(f, report)
+        else:
+            records = iter_json_array(f, report)
+
+        for index, record in enumerate(records):
+            try:
+                bike = Bike.model_validate(record)
+            except ValidationError as e:
+                record_id = record.get("id", "?") if isinstance(record, dict) else "?"
+                first = e.errors()[0]
+                location = ".".join(str(part) for part in first["loc"])
+                report.reject(f"record {index} (id {record_id})", f"{location}: {first['msg']}")
+                continue
+            report.accepted += 1
+            yield bike.model_dump(exclude_none=True)
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most size items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
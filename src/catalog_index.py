@@ -0,0 +1,182 @@
+"""Precomputed in-memory indexes and pre-serialized JSON for the /bikes endpoints."""
+
+import base64
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .catalog import iter_bikes
+from .vector_db import vector_db
+
+
+SORTS = ("id", "price_asc", "price_desc", "name")
+
+
+class InvalidQuery(ValueError):
+    """Raised for unknown sort keys or malformed cursors."""
+
+
+def _sort_key(bike: Dict, sort: str) -> Tuple:
+    """Total-order key per sort (id breaks ties so keyset cursors are stable)."""
+    if sort == "price_asc":
+        return (bike["price_eur"], bike["id"])
+    if sort == "price_desc":
+        return (-bike["price_eur"], bike["id"])
+    if sort == "name":
+        return (bike["name"].lower(), bike["id"])
+    return (bike["id"],)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    """Comma-separated query parameter values, lowercased."""
+    return [part.strip().lower() for part in value.split(",") if part.strip()] if value else []
+
+
+class CatalogIndex:
+    """Filter, sort, paginate and facet the catalog without touching raw records per request.
+
+    Built once per index version: a price-sorted array for bisect range
+    queries, inverted maps per facet field, one pre-sorted order per sort key
+    and every bike pre-serialized to JSON bytes.
+    """
+
+    def __init__(self, bikes: List[Dict], version: int = 0):
+        self.version = version
+        self.bikes = sorted(bikes, key=lambda bike: bike["id"])
+        self.serialized = [json.dumps(bike, ensure_ascii=False).encode("utf-8") for bike in self.bikes]
+        self.etag = hashlib.sha256(b"\n".join(self.serialized)).hexdigest()[:16]
+
+        by_price = sorted(range(len(self.bikes)), key=lambda i: self.bikes[i]["price_eur"])
+        self.price_positions = by_price
+        self.prices = [self.bikes[i]["price_eur"] for i in by_price]
+
+        self.inverted: Dict[str, Dict[str, Set[int]]] = {"type": {}, "brand": {}, "wheel_size": {}}
+        for position, bike in enumerate(self.bikes):
+            for field in ("type", "brand"):
+                self.inverted[field].setdefault(bike[field].lower(), set()).add(position)
+            self.inverted["wheel_size"].setdefault(str(float(bike["wheel_size"])), set()).add(position)
+
+        self.orders: Dict[str, List[int]] = {}
+        self.order_keys: Dict[str, List[Tuple]] = {}
+        for sort in SORTS:
+            order = sorted(range(len(self.bikes)), key=lambda i: _sort_key(self.bikes[i], sort))
+            self.orders[sort] = order
+            self.order_keys[sort] = [_sort_key(self.bikes[i], sort) for i in order]
+
+        self.all_positions = set(range(len(self.bikes)))
+        self.facets_body = json.dumps(self.facets(self.all_positions)).encode("utf-8")
+
+    def candidates(
+        self,
+        type: Optional[str] = None,
+        brand: Optional[str] = None,
+        wheel_size: Optional[float] = None,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None
+    ) -> Set[int]:
+        """Positions matching all filters, from inverted maps and a bisect price range."""
+        result = self.all_positions
+        for field, values in (("type", _split(type)), ("brand", _split(brand))):
+            if values:
+                matched = set().union(*(self.inverted[field].get(value, set()) for value in values))
+                result = result & matched
+        if wheel_size is not None:
+            result = result & self.inverted["wheel_size"].get(str(float(wheel_size)), set())
+        if price_min is not None or price_max is not None:
+            low = bisect_left(self.prices, price_min) if price_min is not None else 0
+            high = bisect_right(self.prices, price_max) if price_max is not None else len(self.prices)
+            result = result & set(self.price_positions[low:high])
+        return result
+
+    def page(
+        self,
+        positions: Set[int],
+        sort: str = "id",
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> bytes:
+        """Serialized page of matching bikes with a keyset cursor for the next page."""
+        if sort not in SORTS:
+            raise InvalidQuery(f"Unknown sort '{sort}', expected one of {', '.join(SORTS)}")
+
+        order, keys = self.orders[sort], self.order_keys[sort]
+        start = 0
+        if cursor:
+            try:
+                start = bisect_right(keys, self._decode_cursor(cursor, sort))
+            except TypeError:
+                raise InvalidQuery("Malformed cursor")
+
+        selected: List[int] = []
+        last_rank, has_more = start, False
+        for rank in range(start, len(order)):
+            if order[rank] not in positions:
+                continue
+            if limit is not None and len(selected) == limit:
+                has_more = True
+                break
+            selected.append(order[rank])
+            last_rank = rank
+
+        next_cursor = self._encode_cursor(sort, keys[last_rank]) if has_more else None
+
+        return b"".join([
+            b'{"bikes":[',
+            b",".join(self.serialized[position] for position in selected),
+            b'],"total":',
+            str(len(positions)).encode("ascii"),
+            b',"next_cursor":',
+            json.dumps(next_cursor).encode("ascii"),
+            b"}",
+        ])
+
+    def facets(self, positions: Set[int]) -> Dict:
+        """Counts per type, brand and wheel size plus the price range of the given positions."""
+        counts: Dict[str, Dict] = {"type": defaultdict(int), "brand": defaultdict(int), "wheel_size": defaultdict(int)}
+        for position in positions:
+            bike = self.bikes[position]
+            counts["type"][bike["type"]] += 1
+            counts["brand"][bike["brand"]] += 1
+            counts["wheel_size"][str(bike["wheel_size"])] += 1
+        prices = [self.bikes[position]["price_eur"] for position in positions]
+        return {
+            "total": len(positions),
+            "facets": {field: dict(sorted(values.items())) for field, values in counts.items()},
+            "price": {"min": min(prices), "max": max(prices)} if prices else None,
+        }
+
+    @staticmethod
+    def _encode_cursor(sort: str, key: Tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps([sort, list(key)]).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str) -> Tuple:
+        try:
+            cursor_sort, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, TypeError):
+            raise InvalidQuery("Malformed cursor")
+        if cursor_sort != sort:
+            raise InvalidQuery("Cursor was issued for a different sort")
+        return tuple(key)
+
+
+_catalog_index: Optional[CatalogIndex] = None
+
+
+def get_catalog_index() -> CatalogIndex:
+    """Catalog index for the active search index version, built on first use after each reload."""
+    global _catalog_index
+    if _catalog_index is None:
+        bikes = list(vector_db.bikes.values()) or list(iter_bikes())
+        _catalog_index = CatalogIndex(bikes, vector_db.version)
+    return _catalog_index
+
+
+def _invalidate(version: int):
+    global _catalog_index
+    _catalog_index = None
+
+
+vector_db.add_reload_listener(_invalidate)
@@ -0,0 +1,122 @@
+"""Per-conversation serialization of agent turns, with optional coalescing of rapid-fire messages,
+and the in-memory state of conversations held by long-lived connections."""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class ConversationBusy(Exception):
+    """Raised when a conversation's previous turn does not finish within the wait budget."""
+
+
+@dataclass
+class _Batch:
+    """Messages waiting for the same agent turn."""
+    messages: List[str]
+    result: asyncio.Future
+
+
+@dataclass
+class _Slot:
+    """Lock and pending batch of one conversation."""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0
+    pending: Optional[_Batch] = None
+
+
+@dataclass
+class ChatSession:
+    """Conversation state kept hot for the lifetime of its connections.
+
+    Turns read and append the session's history instead of the conversation
+    store; the store is only written when the session is flushed.
+    """
+    conversation_id: str
+    dependencies: Any
+    messages: List[Any]
+    memory: List[Dict]
+    connections: int = 0
+    dirty: bool = False
+
+
+class ConversationLocks:
+    """Lock table keyed by conversation id.
+
+    Turns of one conversation run one at a time, in arrival order, so history
+    reads and appends never interleave. A slot is dropped as soon as no request
+    holds or waits for it, so the table only holds active conversations.
+    """
+
+    def __init__(self):
+        self._slots: Dict[str, _Slot] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    async def run(
+        self,
+        conversation_id: str,
+        message: str,
+        turn: Callable[[str], Awaitable[str]],
+        timeout: float,
+        coalesce: bool = False
+    ) -> str:
+        """Run turn(message) under the conversation's lock, waiting at most timeout seconds.
+
+        With coalesce, messages that arrive while an earlier turn is running
+        are merged into one turn, and every caller gets that turn's response.
+        """
+        slot = self._slots.setdefault(conversation_id, _Slot())
+        slot.users += 1
+        try:
+            if coalesce and slot.pending is not None:
+                batch = slot.pending
+                batch.messages.append(message)
+                try:
+                    return await asyncio.wait_for(asyncio.shield(batch.result), timeout)
+                except asyncio.TimeoutError:
+                    raise ConversationBusy(f"Conversation {conversation_id} is busy")
+
+            batch = _Batch([message], asyncio.get_running_loop().create_future())
+            if coalesce:
+                slot.pending = batch
+            try:
+                await asyncio.wait_for(slot.lock.acquire(), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if slot.pending is batch:
+                    slot.pending = None
+                error = ConversationBusy(f"Conversation {conversation_id} is busy")
+                self._fail(batch, error)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise error
+
+            try:
+                # The batch is closed once its turn starts; later messages start a new one
+                if slot.pending is batch:
+                    slot.pending = None
+                combined = "\n".join(batch.messages)
+                try:
+                    response = await turn(combined)
+                except asyncio.CancelledError:
+                    # The leader's client went away; followers get a retryable 429, not a silent cancel
+                    self._fail(batch, ConversationBusy(f"Conversation {conversation_id} turn was cancelled, please retry"))
+                    raise
+                except Exception as e:
+                    self._fail(batch, e)
+                    raise
+                batch.result.set_result(response)
+                return response
+            finally:
+                slot.lock.release()
+        finally:
+            slot.users -= 1
+            if slot.users == 0 and self._slots.get(conversation_id) is slot:
+                del self._slots[conversation_id]
+    
+    @staticmethod
+    def _fail(batch: _Batch, error: Exception):
+        if not batch.result.done():
+            batch.result.set_exception(error)
+            batch.result.exception()  # followers re-raise it; mark it retrieved
@@ -0,0 +1,60 @@
+"""Per-request deadlines carried in a context variable.
+
+The deadline set by the API follows the request into the agent run, tool
+calls and searches: asyncio tasks and ``asyncio.to_thread`` copy the current
+context, so nothing has to pass it explicitly.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the current request's deadline has passed."""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Give the enclosed work `seconds` to finish; nested deadlines can only shorten it."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(min(expires, current) if current is not None else expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(cap: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the deadline, at most cap; None when neither is set."""
+    expires = _deadline.get()
+    if expires is None:
+        return cap
+    left = max(0.0, expires - time.monotonic())
+    return min(left, cap) if cap is not None else left
+
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current deadline has passed."""
+    expires = _deadline.get()
+    if expires is not None and time.monotonic() >= expires:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+async def run_with_deadline(awaitable: Awaitable[T], cap: Optional[float] = None) -> T:
+    """Await with a timeout of the remaining deadline (at most cap), cancelling the work when it expires."""
+    timeout = remaining(cap)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded")
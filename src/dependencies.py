@@ -3,8 +3,8 @@
 from dataclasses import dataclass
 from typing import Optional
 import httpx
-import json
 import os
+from .vector_db import vector_db
 
 
 @dataclass
@@ -41,13 +41,8 @@ class SalesAgentDependencies:
             self.faq_data = self._load_faq_data()
     
     def _load_bike_catalog(self) -> list:
-        """Load bike catalog from Data folder."""
-        try:
-            data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Data", "product_catalog.json")
-            with open(data_path, 'r') as f:
-                return json.load(f)
-        except Exception:
-            return []
+        """Bikes of the active search index snapshot (validated once, at ingestion)."""
+        return list(vector_db.bikes.values())
     
     def _load_faq_data(self) -> str:
         """Load FAQ data from Data folder."""
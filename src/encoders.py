@@ -0,0 +1,144 @@
+"""Sentence encoders used by VectorDB: PyTorch or ONNX Runtime."""
+
+import os
+from typing import List, Protocol, Union
+
+import numpy as np
+
+from .settings import settings
+
+
+HF_REPO = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class Encoder(Protocol):
+    """Anything that turns text into normalized embedding vectors."""
+
+    name: str
+    dim: int
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Encode one text (1-D result) or a list of texts (2-D result)."""
+        ...
+
+
+class SentenceTransformerEncoder:
+    """The original PyTorch SentenceTransformer model."""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", threads: int = 0):
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+
+        self.model = SentenceTransformer(model_name)
+        self.name = f"{model_name}:torch"
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Encode text(s) with the PyTorch model."""
+        return self.model.encode(texts)
+
+
+class OnnxEncoder:
+    """all-MiniLM-L6-v2 exported to ONNX, run with ONNX Runtime (no torch import).
+
+    Reproduces the SentenceTransformer pipeline: tokenize, transformer,
+    attention-masked mean pooling, L2 normalization.
+    """
+
+    def __init__(
+        self,
+        repo_id: str = HF_REPO,
+        model_file: str = "onnx/model.onnx",
+        threads: int = 0,
+        quantize: bool = False,
+        cache_dir: str = None,
+        max_length: int = 256,
+        batch_size: int = 32
+    ):
+        try:
+            import onnxruntime as ort
+            from huggingface_hub import hf_hub_download
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("ONNX encoder requires the 'onnx' extra: onnxruntime, tokenizers, huggingface-hub") from e
+
+        model_path = model_file if os.path.exists(model_file) else hf_hub_download(repo_id, model_file)
+        if quantize:
+            model_path = self._quantized_model(model_path, cache_dir or os.path.dirname(model_path))
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(repo_id, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.batch_size = batch_size
+        self.name = f"{repo_id.split('/')[-1]}:onnx{'-int8' if quantize else ''}"
+        dim = self.session.get_outputs()[0].shape[-1]
+        self.dim = dim if isinstance(dim, int) else 384
+
+    @staticmethod
+    def _quantized_model(model_path: str, cache_dir: str) -> str:
+        """Dynamic int8 quantization of the fp32 model, cached next to it."""
+        quantized_path = os.path.join(cache_dir, "model_int8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """Encode text(s) with ONNX Runtime."""
+        single = isinstance(texts, str)
+        batch_texts = [texts] if single else list(texts)
+        if not batch_texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        outputs = [
+            self._encode_batch(batch_texts[start:start + self.batch_size])
+            for start in range(0, len(batch_texts), self.batch_size)
+        ]
+        embeddings = np.vstack(outputs)
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Run one padded batch through the model and pool it."""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def create_encoder() -> Encoder:
+    """Create the encoder selected in settings."""
+    if settings.encoder_backend == "onnx":
+        return OnnxEncoder(
+            threads=settings.encoder_threads,
+            quantize=settings.encoder_quantize,
+            cache_dir=os.path.join(settings.vector_db_path, "encoder")
+        )
+    if settings.encoder_backend == "torch":
+        return SentenceTransformerEncoder(threads=settings.encoder_threads)
+    raise ValueError(f"Unknown encoder backend: {settings.encoder_backend}")
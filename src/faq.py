@@ -0,0 +1,152 @@
+"""FAQ loading: parse knowledge-base text into structured question/answer entries.
+
+Supported formats, which may be mixed within one file::
+
+    1. Do you offer repair services?        # numbered questions
+    Yes, in all our stores.
+
+    ## Do you offer repair services?         # Markdown headings
+    Yes, in all our stores.
+
+    Q: Do you offer repair services?         # Q:/A: pairs
+    A: Yes, in all our stores.
+"""
+
+import os
+import re
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+FAQ_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Data", "faq.txt")
+
+HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*$")
+Q_PREFIX = re.compile(r"^(?:q|question)\s*[:.]\s*(.+)$", re.IGNORECASE)
+A_PREFIX = re.compile(r"^(?:a|answer)\s*[:.]\s*(.*)$", re.IGNORECASE)
+NUMBERED = re.compile(r"^(\d+)[.)]\s+(.+)$")
+LIST_ITEM = re.compile(r"^(?:\d+[.)]|[-*•])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class _Entry:
+    """Question and answer lines of the entry being parsed."""
+
+    def __init__(self, question: str):
+        self.question = question
+        self.lines: List[str] = []
+        # Number the answer's own numbered list would continue with
+        self.list_next: Optional[int] = None
+
+    def add(self, line: str):
+        numbered = NUMBERED.match(line)
+        if numbered:
+            self.list_next = int(numbered.group(1)) + 1
+        self.lines.append(line)
+
+    def answer(self) -> str:
+        # List items keep their own lines; wrapped prose is joined with spaces
+        text = ""
+        for line in self.lines:
+            if not text:
+                text = line
+            elif LIST_ITEM.match(line):
+                text += "\n" + line
+            else:
+                text += " " + line
+        return text
+
+
+def parse_faq(lines: Iterable[str]) -> Iterator[Dict]:
+    """Yield {id, question, answer} entries in one pass over the lines.
+
+    A numbered line starts a new question when it ends with "?", or when it
+    follows a blank line and carries the next question number, unless that
+    number continues the current answer's own numbered list::
+
+        1. How do I book a service
+        1. Pick a store.
+        2. Choose a time.
+
+        2. What does a service include      # question 2: the list would go on with 3
+        A safety check and adjustments.
+
+    Numbered steps inside answers therefore stay part of the answer.
+    """
+    current: Optional[_Entry] = None
+    count = 0
+    next_number = 1
+    after_blank = True
+
+    for raw in chain(lines, [None]):
+        line = raw.strip() if raw is not None else None
+        question = None
+
+        if line is None:
+            question = ""
+        elif HEADING.match(line):
+            question = HEADING.match(line).group(1)
+        elif Q_PREFIX.match(line):
+            question = Q_PREFIX.match(line).group(1)
+        else:
+            numbered = NUMBERED.match(line)
+            if numbered and (line.endswith("?") or (
+                after_blank and int(numbered.group(1)) == next_number
+                and (current is None or current.list_next != next_number)
+            )):
+                question = numbered.group(2)
+                next_number = int(numbered.group(1)) + 1
+
+        after_blank = not line
+        if question is not None:
+            # A new question (or end of input) completes the previous entry
+            if current is not None and current.question and current.lines:
+                count += 1
+                yield {"id": count, "question": current.question, "answer": current.answer()}
+            current = _Entry(question.strip()) if line is not None else None
+            continue
+
+        if not line or current is None:
+            continue
+        answer = A_PREFIX.match(line)
+        current.add(answer.group(1) if answer and not current.lines else line)
+
+
+def load_faq(path: str = None) -> List[Dict]:
+    """Parse the FAQ file into entries, streaming it line by line."""
+    with open(path or FAQ_PATH, "r", encoding="utf-8") as f:
+        return list(parse_faq(f))
+
+
+def passages(entry: Dict, max_words: int) -> List[str]:
+    """Split an answer into passages of at most max_words, on sentence boundaries where possible."""
+    answer = entry["answer"]
+    if max_words <= 0 or len(answer.split()) <= max_words:
+        return [answer]
+
+    chunks, current, size = [], [], 0
+    for sentence in SENTENCE_END.split(answer):
+        words = sentence.split()
+        # Sentences longer than a passage are cut at word boundaries
+        while len(words) > max_words:
+            if current:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            chunks.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if size + len(words) > max_words and current:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.extend(words)
+        size += len(words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def passage_records(entries: Iterable[Dict], max_words: int) -> Iterator[Tuple[int, str, Dict]]:
+    """(passage id, embedding text, entry) records; each passage is embedded with its question."""
+    passage_id = 0
+    for entry in entries:
+        for passage in passages(entry, max_words):
+            passage_id += 1
+            yield passage_id, f"{entry['question']} {passage}", entry
@@ -0,0 +1,166 @@
+"""Versioned, prebuilt index artifacts that API workers load read-only.
+
+Layout::
+
+    <root>/
+        CURRENT                  # name of the active version directory
+        20261019120000-1a2b3c4d/
+            manifest.json
+            bikes.ids.npy, bikes.vectors.npy, bikes.payloads.json, ...
+            faq.ids.npy, faq.vectors.npy, faq.payloads.json, ...
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .settings import settings
+
+
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+FORMAT_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_artifact(path: str) -> str:
+    """Return the version directory for path, following a CURRENT pointer if present."""
+    pointer = os.path.join(path, CURRENT)
+    if os.path.exists(pointer):
+        with open(pointer, "r") as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def read_manifest(artifact_dir: str) -> Dict:
+    """Read and sanity-check an artifact manifest."""
+    with open(os.path.join(artifact_dir, MANIFEST), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index artifact format: {manifest.get('format')}")
+    return manifest
+
+
+async def build_artifact(output_root: str, source_files: Optional[List[str]] = None) -> str:
+    """Build catalog and FAQ indexes into a new version directory and point CURRENT at it.
+
+    source_files default to the feeds the indexes are built from (CATALOG_PATH and the FAQ).
+    """
+    from .catalog import catalog_path
+    from .faq import FAQ_PATH
+    from .vector_db import VectorDB
+
+    # Artifacts are always flat NumPy collections; mmap is set up by the loader
+    settings.vector_backend = "numpy"
+    settings.vector_mmap = False
+    settings.index_artifact_path = ""
+
+    if source_files is None:
+        source_files = [catalog_path(), FAQ_PATH]
+
+    vector_db = VectorDB()
+    await vector_db.initialize()
+    if not vector_db._initialized or set(vector_db.fingerprints) != {vector_db.bike_collection, vector_db.faq_collection}:
+        raise RuntimeError("Index build failed, see errors above")
+
+    combined = hashlib.sha256("".join(sorted(vector_db.fingerprints.values())).encode("utf-8")).hexdigest()
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{combined[:8]}"
+    os.makedirs(output_root, exist_ok=True)
+    staging_dir = os.path.join(output_root, f".{version}.tmp")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    collections = {}
+    for name, fingerprint in vector_db.fingerprints.items():
+        vector_db.backend.save(name, staging_dir, fingerprint)
+        collections[name] = {
+            "fingerprint": fingerprint,
+            "count": len(vector_db.backend.collections[name].ids),
+            "files": {
+                filename: file_digest(os.path.join(staging_dir, filename))
+                for filename in sorted(os.listdir(staging_dir))
+                if filename.startswith(f"{name}.")
+            },
+        }
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "encoder": vector_db.encoder.name,
+        "dim": vector_db.encoder.dim,
+        "quantization": settings.vector_quantization,
+        "sources": {os.path.basename(path): file_digest(path) for path in source_files if os.path.exists(path)},
+        "collections": collections,
+    }
+    with open(os.path.join(staging_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    errors = validate_artifact(staging_dir)
+    if errors:
+        raise RuntimeError("Built artifact failed validation: " + "; ".join(errors))
+
+    artifact_dir = os.path.join(output_root, version)
+    os.replace(staging_dir, artifact_dir)
+    set_current(output_root, version)
+    return artifact_dir
+
+
+def set_current(output_root: str, version: str):
+    """Atomically point CURRENT at a version directory."""
+    pointer = os.path.join(output_root, CURRENT)
+    tmp_pointer = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+
+
+def validate_artifact(path: str) -> List[str]:
+    """Check manifest, file checksums, shapes and a self-retrieval query per collection."""
+    from .vector_backends import NumpyCollection
+
+    errors = []
+    artifact_dir = resolve_artifact(path)
+    try:
+        manifest = read_manifest(artifact_dir)
+    except (OSError, ValueError) as e:
+        return [f"manifest: {e}"]
+
+    for name, info in manifest.get("collections", {}).items():
+        for filename, expected in info.get("files", {}).items():
+            file_path = os.path.join(artifact_dir, filename)
+            if not os.path.exists(file_path):
+                errors.append(f"{filename}: missing")
+            elif file_digest(file_path) != expected:
+                errors.append(f"{filename}: checksum mismatch")
+
+        collection = NumpyCollection.load(
+            artifact_dir, name, info["fingerprint"], quantization=manifest.get("quantization", "none")
+        )
+        if collection is None:
+            errors.append(f"{name}: cannot be loaded")
+            continue
+        if len(collection.ids) != info["count"] or collection.dim != manifest["dim"]:
+            errors.append(f"{name}: expected {info['count']} x {manifest['dim']}, "
+                          f"found {len(collection.ids)} x {collection.dim}")
+            continue
+        if len(collection.ids):
+            # Each stored vector must retrieve its own row first
+            probe = np.asarray(collection.vectors[0], dtype=np.float32)
+            hits = collection.search(probe, 1)
+            if not hits or hits[0].id != int(collection.ids[0]):
+                errors.append(f"{name}: self-retrieval check failed")
+
+    return errors
@@ -0,0 +1,130 @@
+"""In-memory BM25 index and rank fusion for hybrid catalog search."""
+
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:\.[0-9]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into word tokens (keeps 27.5 intact)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize(text: str) -> str:
+    """Normalize text for exact name/brand comparison."""
+    return " ".join(tokenize(text))
+
+
+def bike_to_text(bike: Dict) -> str:
+    """Flatten every catalog field of a bike into one searchable string."""
+    parts = [
+        bike.get("name", ""),
+        bike.get("brand", ""),
+        bike.get("type", ""),
+        f"{bike.get('frame_material', '')} frame",
+        bike.get("suspension", ""),
+        f"{bike.get('wheel_size', '')} inch wheels",
+        f"{bike.get('gears', '')} gears",
+        f"{bike.get('brakes', '')} brakes",
+        f"{bike.get('weight_kg', '')} kg",
+        " ".join(bike.get("intended_use", [])),
+        bike.get("color", ""),
+    ]
+    known = {
+        "id", "name", "brand", "type", "frame_material", "suspension", "wheel_size",
+        "gears", "brakes", "weight_kg", "intended_use", "color", "price_eur",
+    }
+    # Optional fields (motor power, battery, range, ...) are appended as "key value"
+    for key, value in bike.items():
+        if key not in known:
+            parts.append(f"{key.replace('_', ' ')} {value}")
+    return " ".join(str(part) for part in parts if part)
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of document tokens."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_ids: List[Any] = []
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+
+    def build(self, documents: Iterable[Tuple[Any, str]]):
+        """Build the index from (doc_id, text) pairs, replacing any previous content."""
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_ids = []
+        self.doc_lengths = []
+
+        for doc_id, text in documents:
+            tokens = tokenize(text)
+            position = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_lengths.append(len(tokens))
+
+            counts: Dict[str, int] = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, tf in counts.items():
+                postings[token].append((position, tf))
+
+        self.postings = dict(postings)
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[Any, float]]:
+        """Return (doc_id, score) pairs ranked by BM25 score."""
+        n_docs = len(self.doc_ids)
+        if not n_docs:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for position, tf in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[position] / self.avg_length
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.doc_ids[position], score) for position, score in ranked]
+
+
+class ExactMatchIndex:
+    """Exact lookup of bikes by normalized name or brand."""
+
+    def __init__(self):
+        self.names: Dict[str, List[Any]] = {}
+        self.brands: Dict[str, List[Any]] = {}
+
+    def build(self, bikes: Iterable[Dict]):
+        """Build name and brand lookup tables from catalog entries."""
+        names: Dict[str, List[Any]] = defaultdict(list)
+        brands: Dict[str, List[Any]] = defaultdict(list)
+        for bike in bikes:
+            names[normalize(bike["name"])].append(bike["id"])
+            brands[normalize(bike["brand"])].append(bike["id"])
+        self.names = dict(names)
+        self.brands = dict(brands)
+
+    def lookup(self, query: str) -> List[Any]:
+        """Return bike ids whose name or brand equals the query, if any."""
+        key = normalize(query)
+        return self.names.get(key) or self.brands.get(key) or []
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], k: int = 60) -> List[Any]:
+    """Fuse several ranked id lists into one using reciprocal rank fusion."""
+    scores: Dict[Any, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
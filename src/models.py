@@ -1,16 +1,59 @@
 """Pydantic models for bike sales agent."""
 
-from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ChatRequest(BaseModel):
     """Chat request model."""
     message: str
     conversation_id: str
+    include_usage: bool = False
+
+
+class Usage(BaseModel):
+    """LLM usage of a turn or a conversation."""
+    requests: int = 0
+    tool_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    total_tokens: int = 0
+
+
+class UsageReport(BaseModel):
+    """Usage of the current turn and the conversation so far."""
+    turn: Usage
+    conversation: Usage
+    conversation_budget: Optional[int] = None
 
 
 class ChatResponse(BaseModel):
     """Chat response model."""
     response: str
     conversation_id: str
-    interest_detected: bool = False
\ No newline at end of file
+    interest_detected: bool = False
+    usage: Optional[UsageReport] = None
+
+
+class Bike(BaseModel):
+    """Bike catalog entry."""
+    model_config = ConfigDict(extra="allow")
+    
+    id: int
+    name: str = Field(min_length=1)
+    type: str
+    brand: str
+    price_eur: Union[int, float] = Field(ge=0)
+    frame_material: str
+    suspension: str
+    wheel_size: Union[int, float] = Field(gt=0)
+    gears: int = Field(ge=1)
+    brakes: str
+    weight_kg: Union[int, float] = Field(gt=0)
+    intended_use: List[str]
+    color: str
+    motor_power_w: Optional[int] = None
+    battery_capacity_wh: Optional[int] = None
+    range_km: Optional[int] = None
+    max_load_kg: Optional[int] = None
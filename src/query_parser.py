@@ -0,0 +1,164 @@
+"""Rule-based parsing of free-text bike queries into search filters."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+from .lexical_index import tokenize
+
+
+# Common spellings that do not appear verbatim in the catalog
+TYPE_ALIASES = {
+    "mtb": "mountain bike",
+    "ebike": "e bike",
+    "pedelec": "e bike",
+    "emtb": "e mountain bike",
+    "fatbike": "fat bike",
+}
+MATERIAL_ALIASES = {
+    "aluminium": "aluminum",
+    "alloy": "aluminum",
+    "alu": "aluminum",
+}
+
+NUMBER = r"(\d[\d.,]*)(?!\s*(?:kg|km|gears?|speeds?|inch|in\b|\"|wh|w\b|%|\d))\s*(?:k\b)?"
+CURRENCY = r"(?:€|eur\b|euros?\b)?"
+PRICE_BETWEEN = re.compile(
+    rf"(?:between|from)\s*€?\s*{NUMBER}\s*{CURRENCY}\s*(?:and|to|-)\s*€?\s*{NUMBER}\s*{CURRENCY}", re.IGNORECASE
+)
+PRICE_RANGE = re.compile(rf"€?\s*(\d[\d.,]*)\s*-\s*€?\s*(\d[\d.,]*)\s*(?:€|eur\b|euros?\b)", re.IGNORECASE)
+PRICE_MAX = re.compile(
+    rf"(?:under|below|less than|up to|max(?:imum)?|at most|budget(?: of| is)?|cheaper than|<)\s*€?\s*{NUMBER}\s*{CURRENCY}",
+    re.IGNORECASE,
+)
+PRICE_MIN = re.compile(
+    rf"(?:over|above|more than|at least|min(?:imum)?|>)\s*€?\s*{NUMBER}\s*{CURRENCY}",
+    re.IGNORECASE,
+)
+WHEEL_SIZE = re.compile(r"(\d{2}(?:\.\d)?)\s*(?:\"|''|”|-?\s*inch(?:es)?\b|in\b|zoll\b|er\b)", re.IGNORECASE)
+
+
+def stem(token: str) -> str:
+    """Crude suffix stripping so commuter/commuting/commute compare equal."""
+    for suffix in ("ing", "ers", "er", "es", "e", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    return token
+
+
+def _parse_amount(raw: str, text_after: str = "") -> float:
+    """Parse '1.500', '1,500' or '2k' style amounts into a number."""
+    digits = raw.replace(",", "").replace(".", "") if re.fullmatch(r"\d{1,3}([.,]\d{3})+", raw) else raw.replace(",", ".")
+    value = float(digits)
+    if text_after.lower().startswith("k"):
+        value *= 1000
+    return value
+
+
+@dataclass
+class ParsedQuery:
+    """Result of parsing a free-text query."""
+
+    text: str
+    filters: Dict = field(default_factory=dict)
+
+
+class QueryParser:
+    """Extract price, type, brand, wheel size, material and use-case filters from text."""
+
+    def __init__(
+        self,
+        types: Iterable[str] = (),
+        brands: Iterable[str] = (),
+        materials: Iterable[str] = (),
+        use_cases: Iterable[str] = (),
+        wheel_sizes: Iterable[float] = (),
+    ):
+        self.types = self._phrases(types)
+        self.brands = self._phrases(brands)
+        self.materials = self._phrases(materials)
+        self.use_cases = self._phrases(use_cases)
+        self.wheel_sizes = set(float(size) for size in wheel_sizes)
+
+    @classmethod
+    def from_catalog(cls, bikes: Iterable[Dict]) -> "QueryParser":
+        """Derive vocabularies from the catalog entries."""
+        types, brands, materials, use_cases, wheel_sizes = set(), set(), set(), set(), set()
+        for bike in bikes:
+            types.add(bike["type"])
+            brands.add(bike["brand"])
+            if bike.get("frame_material"):
+                materials.add(bike["frame_material"])
+            use_cases.update(bike.get("intended_use", []))
+            if bike.get("wheel_size"):
+                wheel_sizes.add(bike["wheel_size"])
+        return cls(types, brands, materials, use_cases, wheel_sizes)
+
+    @staticmethod
+    def _phrases(values: Iterable[str]) -> List[Tuple[Tuple[str, ...], str]]:
+        """Stemmed token phrases mapped to canonical values, longest first."""
+        phrases = [(tuple(stem(token) for token in tokenize(value)), value) for value in values]
+        return sorted((phrase for phrase in phrases if phrase[0]), key=lambda phrase: len(phrase[0]), reverse=True)
+
+    @staticmethod
+    def _match(tokens: List[str], used: List[bool], phrases: List[Tuple[Tuple[str, ...], str]]) -> List[str]:
+        """Greedy longest-phrase matching over unused token positions."""
+        matches = []
+        for phrase, value in phrases:
+            size = len(phrase)
+            for start in range(len(tokens) - size + 1):
+                if any(used[start:start + size]):
+                    continue
+                if tuple(tokens[start:start + size]) == phrase:
+                    for position in range(start, start + size):
+                        used[position] = True
+                    if value not in matches:
+                        matches.append(value)
+        return matches
+
+    def parse(self, query: str) -> ParsedQuery:
+        """Parse a query into residual text plus filters."""
+        filters: Dict = {}
+        text = query
+
+        match = PRICE_BETWEEN.search(text) or PRICE_RANGE.search(text)
+        if match:
+            low, high = _parse_amount(match.group(1)), _parse_amount(match.group(2))
+            filters["price_min"], filters["price_max"] = min(low, high), max(low, high)
+            text = text.replace(match.group(0), " ")
+        else:
+            match = PRICE_MAX.search(text)
+            if match:
+                filters["price_max"] = _parse_amount(match.group(1), text[match.end(1):].strip())
+                text = text.replace(match.group(0), " ")
+            match = PRICE_MIN.search(text)
+            if match:
+                filters["price_min"] = _parse_amount(match.group(1), text[match.end(1):].strip())
+                text = text.replace(match.group(0), " ")
+
+        for match in WHEEL_SIZE.finditer(text):
+            size = float(match.group(1))
+            if size in self.wheel_sizes:
+                filters["wheel_size"] = size
+                text = text.replace(match.group(0), " ")
+                break
+
+        raw_tokens = tokenize(text)
+        tokens = []
+        for token in raw_tokens:
+            alias = TYPE_ALIASES.get(token) or MATERIAL_ALIASES.get(token)
+            tokens.extend(stem(part) for part in (alias.split() if alias else [token]))
+        used = [False] * len(tokens)
+
+        for key, phrases in (
+            ("types", self.types),
+            ("brands", self.brands),
+            ("frame_materials", self.materials),
+            ("intended_use", self.use_cases),
+        ):
+            values = self._match(tokens, used, phrases)
+            if values:
+                filters[key] = values
+
+        residual = " ".join(text.split())
+        return ParsedQuery(text=residual or query, filters=filters)
@@ -0,0 +1,39 @@
+"""Hot reload of search indexes when catalog or FAQ files change."""
+
+import asyncio
+import os
+from typing import Dict, List
+
+
+def _mtimes(paths: List[str]) -> Dict[str, float]:
+    """Modification time per path (0 when missing)."""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            mtimes[path] = 0.0
+    return mtimes
+
+
+async def watch_for_changes(vector_db, interval: float):
+    """Poll the watched files and reload the indexes once a change has settled."""
+    seen = _mtimes(vector_db.watched_paths())
+    while True:
+        await asyncio.sleep(interval)
+        current = _mtimes(vector_db.watched_paths())
+        if current == seen:
+            continue
+
+        # Wait for writers to finish before rebuilding
+        await asyncio.sleep(interval)
+        settled = _mtimes(vector_db.watched_paths())
+        if settled != current:
+            continue
+
+        seen = settled
+        print("Catalog or FAQ changed, reloading indexes")
+        try:
+            await vector_db.reload()
+        except Exception as e:
+            print(f"Index reload failed: {e}")
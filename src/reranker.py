@@ -0,0 +1,139 @@
+"""Optional second-stage reranking of bike search candidates with a cross-encoder."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .deadlines import remaining
+from .lexical_index import bike_to_text
+from .metrics import REGISTRY
+from .settings import settings
+
+
+CacheKey = Tuple[int, str, int]
+
+
+class CrossEncoderReranker:
+    """Scores (query, bike) pairs with a small cross-encoder on CPU.
+
+    Scores are cached per (index version, query, bike id) in an LRU, so
+    repeated and overlapping searches only score new pairs. Reranking has a
+    latency budget: it is skipped when the uncached pairs are expected to take
+    longer, and abandoned (keeping the first-stage order) when it runs over.
+    An abandoned batch still finishes in the background and fills the cache.
+    """
+
+    def __init__(self, model_name: str, cache_size: int = 4096, batch_size: int = 32):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._scores: "OrderedDict[CacheKey, float]" = OrderedDict()
+        self._scores_lock = threading.Lock()
+        # Seconds per scored pair, an exponentially weighted average of observed batches
+        self.pair_seconds: Optional[float] = None
+        self._background: Optional[asyncio.Future] = None
+
+        self.metric_seconds = REGISTRY.histogram("rerank_seconds", "Time spent reranking search candidates")
+        self.metric_skipped = REGISTRY.counter("rerank_skipped_total", "Searches returned without reranking, by reason")
+        self.metric_cache = REGISTRY.counter("rerank_cache_total", "Reranker score lookups by result")
+
+    def load(self):
+        """Load the model (downloaded on first use); safe to call from several threads."""
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+
+                model = CrossEncoder(self.model_name, device="cpu")
+                # The first prediction is much slower than the rest; don't spend a search's budget on it
+                model.predict([("bike", "bike")], show_progress_bar=False)
+                self._model = model
+                print(f"Loaded reranker {self.model_name}")
+        return self._model
+
+    def _cached(self, keys: List[CacheKey]) -> Dict[CacheKey, float]:
+        found = {}
+        with self._scores_lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                    found[key] = score
+        self.metric_cache.inc(len(found), result="hit")
+        self.metric_cache.inc(len(keys) - len(found), result="miss")
+        return found
+
+    def _score(self, query: str, keys: List[CacheKey], texts: List[str]) -> Dict[CacheKey, float]:
+        """Score uncached pairs in batches and cache them (runs in a worker thread)."""
+        model = self.load()
+        started = time.perf_counter()
+        scores = model.predict([(query, text) for text in texts], batch_size=self.batch_size, show_progress_bar=False)
+        elapsed = time.perf_counter() - started
+        per_pair = elapsed / max(1, len(texts))
+        self.pair_seconds = per_pair if self.pair_seconds is None else 0.8 * self.pair_seconds + 0.2 * per_pair
+
+        scored = {key: float(score) for key, score in zip(keys, scores)}
+        if self.cache_size > 0:
+            with self._scores_lock:
+                self._scores.update(scored)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+        return scored
+
+    def _start(self, query: str, keys: List[CacheKey], bikes: List[Dict], missing: List[int]) -> asyncio.Future:
+        work = asyncio.ensure_future(asyncio.to_thread(
+            self._score, query, [keys[i] for i in missing], [bike_to_text(bikes[i]) for i in missing]
+        ))
+        # Retrieve the outcome even when the search has stopped waiting for it
+        work.add_done_callback(lambda future: future.cancelled() or future.exception())
+        return work
+
+    async def rerank(self, query: str, bikes: List[Dict], version: int, budget: float) -> List[Dict]:
+        """Bikes ordered by cross-encoder score, or unchanged if the budget does not allow it."""
+        started = time.perf_counter()
+        normalized = " ".join(query.lower().split())
+        keys = [(version, normalized, bike["id"]) for bike in bikes]
+        scores = self._cached(keys)
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+
+        if missing:
+            budget = remaining(budget)
+            if self._model is None:
+                # Loaded at startup; never block a search on it
+                self.metric_skipped.inc(reason="loading")
+                return bikes
+            if self.pair_seconds is not None and self.pair_seconds * len(missing) > budget:
+                self.metric_skipped.inc(reason="budget")
+                # Score one skipped search at a time in the background, so the cache
+                # fills for repeat queries and the estimate follows the current load
+                if self._background is None or self._background.done():
+                    self._background = self._start(normalized, keys, bikes, missing)
+                return bikes
+            work = self._start(normalized, keys, bikes, missing)
+            try:
+                scores.update(await asyncio.wait_for(asyncio.shield(work), budget))
+            except asyncio.TimeoutError:
+                self.metric_skipped.inc(reason="timeout")
+                return bikes
+            except Exception as e:
+                print(f"Reranking failed: {e}")
+                self.metric_skipped.inc(reason="error")
+                return bikes
+
+        order = sorted(range(len(bikes)), key=lambda i: scores[keys[i]], reverse=True)
+        self.metric_seconds.observe(time.perf_counter() - started)
+        return [bikes[i] for i in order]
+
+
+def create_reranker() -> Optional[CrossEncoderReranker]:
+    """The reranker selected in settings, or None when reranking is off."""
+    if not settings.rerank_model:
+        return None
+    return CrossEncoderReranker(
+        settings.rerank_model,
+        cache_size=settings.rerank_cache_size,
+        batch_size=settings.rerank_batch_size
+    )
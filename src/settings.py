@@ -20,11 +20,95 @@ class Settings(BaseSettings):
     # LLM Configuration
     openai_api_key: str = Field(..., description="OpenAI API key")
     llm_model: str = Field(default="gpt-4o-mini", description="LLM model")
+    llm_fast_model: str = Field(default="", description="Cheaper model for simple turns (greetings, FAQ lookups); empty = always use llm_model")
+    speculative_retrieval: bool = Field(default=True, description="Retrieve bikes and FAQs for each message before the first LLM call")
+    speculative_retrieval_timeout: float = Field(default=0.5, description="Seconds to wait for speculative retrieval before running without it")
+    conversation_token_budget: int = Field(default=0, description="Tokens a conversation may use before it is wrapped up (0 = unlimited)")
+    summarize_at: float = Field(default=0.7, description="Fraction of the token budget after which long histories are summarized")
+    summary_min_messages: int = Field(default=8, description="Only summarize histories with at least this many model messages")
+    lead_capture_allowance: int = Field(default=4000, description="Tokens past the conversation budget still allowed for turns with contact details, so leads are captured")
+    usage_max_conversations: int = Field(default=10000, description="Conversations whose token usage is tracked; the least recently active are dropped first")
+    usage_ttl_seconds: float = Field(default=86400.0, description="Drop a conversation's tracked usage (and budget) after this many idle seconds")
+    turn_request_limit: int = Field(default=8, description="LLM requests (tool-call steps) allowed per turn (0 = unlimited)")
+    turn_token_limit: int = Field(default=0, description="Tokens allowed per turn (0 = unlimited)")
+    history_max_messages: int = Field(default=40, description="Model messages (including tool calls) kept per conversation; over it, history is cut back to half")
+    request_timeout: float = Field(default=60.0, description="Deadline in seconds for a /chat request, including queueing (0 = none)")
+    tool_timeout: float = Field(default=15.0, description="Upper bound in seconds for a single tool call")
+    conversation_lock_timeout: float = Field(default=30.0, description="Seconds a message waits for the conversation's previous turn")
+    coalesce_messages: bool = Field(default=False, description="Merge messages sent while a turn is running into one agent turn")
+    llm_cassette_mode: str = Field(default="off", description="Record LLM calls to a cassette or replay them offline: 'off', 'record' or 'replay'")
+    llm_cassette_path: str = Field(default="./data/cassettes/agent.jsonl", description="Cassette file for recorded LLM calls")
+    llm_cassette_latency: float = Field(default=-1.0, description="Simulated seconds per replayed LLM call (negative = as recorded)")
+    
+    # Admission control
+    max_concurrent_runs: int = Field(default=8, description="Agent runs allowed in parallel across all clients")
+    max_queued_runs: int = Field(default=32, description="Requests allowed to wait for a run slot before shedding")
+    max_queue_wait: float = Field(default=10.0, description="Seconds a request may wait (or is expected to wait) for a run slot")
+    max_runs_per_client: int = Field(default=2, description="Running plus queued requests allowed per client")
+    max_batch_runs: int = Field(default=4, description="Run slots /chat/batch turns may hold at once; waiting interactive requests always go first")
+    admission_client_key: str = Field(default="conversation", description="Client identity for fairness: 'conversation' or 'ip'")
+    trusted_proxies: str = Field(default="", description="Comma-separated proxy IPs whose X-Forwarded-For is used as the client IP in 'ip' mode")
+    
+    # WebSocket chat sessions
+    ws_flush_idle_seconds: float = Field(default=5.0, description="Write a session's history to the conversation store after this many idle seconds")
+    ws_idle_timeout: float = Field(default=600.0, description="Close WebSocket sessions idle for this many seconds (0 = never)")
+    
+    # Batch chat
+    batch_concurrency: int = Field(default=8, description="Default concurrent turns of a batch run")
+    batch_max_concurrency: int = Field(default=32, description="Upper bound on the concurrency a batch request may ask for")
+    batch_max_items: int = Field(default=10000, description="Items accepted per /chat/batch request (0 = unlimited)")
+    batch_max_body_bytes: int = Field(default=10 * 1024 * 1024, description="Largest /chat/batch request body in bytes, rejected with 413 before parsing (0 = unlimited)")
+    
+    # Catalog feed
+    catalog_path: str = Field(default="", description="Product feed (JSON array or .jsonl); defaults to Data/")
     
     # Vector Database
     qdrant_host: str = Field(default="localhost", description="Qdrant host")
     qdrant_port: int = Field(default=6333, description="Qdrant port")
     vector_db_path: str = Field(default="./data/vector_db", description="Vector DB path")
+    vector_backend: str = Field(default="qdrant", description="Vector search backend: qdrant or numpy")
+    vector_mmap: bool = Field(default=False, description="Persist NumPy embeddings under vector_db_path and mmap them")
+    vector_quantization: str = Field(
+        default="none",
+        description="NumPy backend code type: none, int8 or binary (float vectors kept memory-mapped for rescoring)"
+    )
+    vector_rescore_multiplier: int = Field(default=4, description="Quantized candidates rescored per result")
+    hybrid_search: bool = Field(default=True, description="Fuse BM25 and vector rankings for bike search")
+    rrf_k: int = Field(default=60, description="Reciprocal rank fusion constant")
+    query_parsing: bool = Field(default=True, description="Extract filters from free-text bike queries")
+    query_cache_size: int = Field(default=1024, description="Query embeddings kept in the LRU cache (0 = disabled)")
+    faq_passage_words: int = Field(default=120, description="Split longer FAQ answers into passages of this many words for embedding")
+    search_candidates: int = Field(default=20, description="Candidates per ranking before fusion and filtering")
+    
+    # Reranking
+    rerank_model: str = Field(default="", description="Cross-encoder reranking bike search candidates, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2 (empty = off)")
+    rerank_candidates: int = Field(default=10, description="Top first-stage candidates reranked per bike search")
+    rerank_timeout: float = Field(default=0.15, description="Latency budget in seconds for reranking; over it, the first-stage order is kept")
+    rerank_cache_size: int = Field(default=4096, description="(query, bike) scores kept in the reranker LRU cache (0 = disabled)")
+    rerank_batch_size: int = Field(default=32, description="Pairs scored per cross-encoder batch")
+    
+    # Embedding encoder
+    encoder_backend: str = Field(default="torch", description="Sentence encoder runtime: torch or onnx")
+    encoder_threads: int = Field(default=0, description="Encoder intra-op threads (0 = runtime default)")
+    encoder_quantize: bool = Field(default=False, description="Use a dynamically int8-quantized ONNX model")
+    
+    # Index building
+    index_artifact_path: str = Field(
+        default="",
+        description="Prebuilt index artifact (version dir or root with CURRENT) loaded read-only at boot"
+    )
+    index_workers: int = Field(default=0, description="Encoder worker processes for bulk indexing (0/1 = in-process)")
+    index_chunk_size: int = Field(default=256, description="Records per encoded chunk in bulk indexing")
+    index_worker_nice: int = Field(default=10, description="Niceness of encoder workers so serving keeps priority")
+    bulk_index_min_records: int = Field(default=5000, description="Smallest collection that uses the process pool")
+    
+    # Hot reload
+    reload_poll_seconds: float = Field(default=0, description="Poll catalog/FAQ files for changes (0 = disabled)")
+    reload_max_rejected_ratio: float = Field(default=0.0, description="Share of rejected catalog records a reload tolerates; above it the current index keeps serving")
+    admin_token: str = Field(default="", description="Token required by /admin endpoints and /chat/batch (X-Admin-Token header); they are disabled while empty")
+    
+    # HTTP caching
+    static_max_age: int = Field(default=300, description="Cache-Control max-age (seconds) for /bikes and /faq responses")
     
     # CRM Configuration
     crm_api_url: str = Field(default="https://api.example-crm.com", description="CRM API URL")
@@ -0,0 +1,112 @@
+"""Responses rendered once per data version, with precompressed variants for CDN-friendly serving."""
+
+import gzip
+import hashlib
+from typing import Callable, Dict, Optional
+
+from fastapi import Response
+
+from .settings import settings
+from .vector_db import vector_db
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Preferred order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip", "identity")
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """True when an If-None-Match header names any of the given representations."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(etag in tags for etag in etags)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """ETag and Cache-Control headers shared by all catalog/FAQ responses."""
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.static_max_age}",
+        "Vary": "Accept-Encoding",
+    }
+
+
+class PreparedResponse:
+    """A JSON body serialized once, with gzip (and brotli, if installed) variants."""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for coding, data in compressed.items():
+            # Tiny bodies can grow when compressed; serve those as-is
+            if len(data) < len(body):
+                self.variants[coding] = data
+        # Each encoding is a distinct representation, so each gets its own strong ETag
+        self.etags = {coding: f'"{digest}-{coding}"' for coding in self.variants}
+
+    def choose_encoding(self, accept_encoding: Optional[str]) -> str:
+        """Best available variant for the client's Accept-Encoding."""
+        accepted = _accepted_encodings(accept_encoding)
+        best, best_q = "identity", 0.0
+        for coding in ENCODINGS:
+            if coding not in self.variants or coding == "identity":
+                continue
+            q = accepted.get(coding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def respond(self, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+        """200 with the negotiated variant, or 304 if the client already has it."""
+        coding = self.choose_encoding(accept_encoding)
+        headers = cache_headers(self.etags[coding])
+        if etag_matches(if_none_match, *self.etags.values()):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=self.variants[coding], media_type=self.media_type, headers=headers)
+
+
+_prepared: Dict[str, PreparedResponse] = {}
+
+
+def prepared_response(name: str, render: Callable[[], bytes]) -> PreparedResponse:
+    """Render and compress a response body once per index version."""
+    response = _prepared.get(name)
+    if response is None:
+        response = _prepared[name] = PreparedResponse(render())
+    return response
+
+
+def _invalidate(version: int):
+    _prepared.clear()
+
+
+vector_db.add_reload_listener(_invalidate)
@@ -3,7 +3,11 @@
 from typing import Dict, List, Optional
 from pydantic_ai import RunContext
 from .dependencies import SalesAgentDependencies
+from .deadlines import DeadlineExceeded, check_deadline, run_with_deadline
+from .vector_db import vector_db
+from .settings import settings
 import json
+import zlib
 
 
 async def product_search_tool(
@@ -13,13 +17,13 @@ async def product_search_tool(
 ) -> str:
     """Search bike catalog using vector similarity."""
     try:
-        from bike_sales_agent.vector_db import vector_db
-        
         # Initialize vector DB if needed
         await vector_db.initialize()
         
         # Use vector search
-        bikes = await vector_db.search_bikes(query, limit=5, filters=filters)
+        bikes = await run_with_deadline(
+            vector_db.search_bikes(query, limit=5, filters=filters), cap=settings.tool_timeout
+        )
         
         if not bikes:
             return f"No bikes found matching '{query}'"
@@ -34,6 +38,10 @@ async def product_search_tool(
         
         return response
         
+    except DeadlineExceeded:
+        # Past the request deadline this ends the turn; otherwise only the tool's own cap ran out
+        check_deadline()
+        return "Product search timed out, please try again"
     except Exception as e:
         return f"Product search failed: {str(e)}"
 
@@ -59,7 +67,7 @@ async def create_lead_tool(
         # Simulate CRM API call
         if ctx.deps.http_client:
             # In production: response = await ctx.deps.http_client.post(crm_url, json=lead_data)
-            lead_id = f"LEAD_{hash(email) % 10000}"
+            lead_id = f"LEAD_{zlib.crc32(email.encode()) % 10000}"
             return f"Lead created successfully! Lead ID: {lead_id}"
         else:
             return "CRM service not available"
@@ -74,13 +82,11 @@ async def faq_search_tool(
 ) -> str:
     """Search FAQ knowledge base."""
     try:
-        from bike_sales_agent.vector_db import vector_db
-        
         # Initialize vector DB if needed
         await vector_db.initialize()
         
         # Use vector search
-        faqs = await vector_db.search_faq(question, limit=3)
+        faqs = await run_with_deadline(vector_db.search_faq(question, limit=3), cap=settings.tool_timeout)
         
         if not faqs:
             return "I don't have specific information about that in our FAQ. Let me help you with what I know, or you can contact our customer service team."
@@ -89,6 +95,9 @@ async def faq_search_tool(
         best_faq = faqs[0]
         return f"Q: {best_faq['question']}\nA: {best_faq['answer']}"
         
+    except DeadlineExceeded:
+        check_deadline()
+        return "FAQ search timed out, please try again"
     except Exception as e:
         return f"FAQ search failed: {str(e)}"
 
@@ -0,0 +1,92 @@
+"""Token and request usage accounting per conversation and for the whole process."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from pydantic_ai.usage import RunUsage
+
+from .metrics import REGISTRY
+from .models import Usage
+from .settings import settings
+
+
+def to_usage(run_usage: RunUsage) -> Usage:
+    """Convert pydantic-ai run usage into the API model."""
+    return Usage(
+        requests=run_usage.requests,
+        tool_calls=run_usage.tool_calls,
+        input_tokens=run_usage.input_tokens,
+        output_tokens=run_usage.output_tokens,
+        cached_tokens=run_usage.cache_read_tokens,
+        total_tokens=run_usage.input_tokens + run_usage.output_tokens,
+    )
+
+
+class UsageTracker:
+    """Running usage totals per conversation and globally, mirrored into metrics.
+
+    Per-conversation usage is kept for the most recently active conversations
+    only: entries idle longer than the TTL, or beyond the size limit (least
+    recently active first), are dropped.
+    """
+
+    def __init__(self, max_conversations: int = 10000, ttl_seconds: float = 86400.0):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self._conversations: "OrderedDict[str, RunUsage]" = OrderedDict()
+        self._last_turn: Dict[str, RunUsage] = {}
+        self._active: Dict[str, float] = {}
+        self.total = RunUsage()
+        self._lock = threading.Lock()
+
+        self.metric_requests = REGISTRY.counter("llm_requests_total", "LLM API requests made by agent runs")
+        self.metric_tool_calls = REGISTRY.counter("agent_tool_calls_total", "Tool calls executed by agent runs")
+        self.metric_tokens = REGISTRY.counter("llm_tokens_total", "LLM tokens by direction")
+        self.metric_budget = REGISTRY.counter("conversation_budget_events_total", "Budget-triggered summaries and wrap-ups")
+        self.metric_conversations = REGISTRY.gauge(
+            "conversations_tracked", "Conversations with recorded usage", lambda: len(self._conversations)
+        )
+
+    def record(self, conversation_id: str, run_usage: RunUsage):
+        """Add one turn's usage (including any summarization) to the conversation and global totals."""
+        now = time.monotonic()
+        with self._lock:
+            self._conversations.setdefault(conversation_id, RunUsage()).incr(run_usage)
+            self._conversations.move_to_end(conversation_id)
+            self._last_turn[conversation_id] = run_usage
+            self._active[conversation_id] = now
+            self.total.incr(run_usage)
+            self._evict(now)
+        self.metric_requests.inc(run_usage.requests)
+        self.metric_tool_calls.inc(run_usage.tool_calls)
+        self.metric_tokens.inc(run_usage.input_tokens, direction="input")
+        self.metric_tokens.inc(run_usage.output_tokens, direction="output")
+        self.metric_tokens.inc(run_usage.cache_read_tokens, direction="cached")
+
+    def _evict(self, now: float):
+        """Drop the least recently active conversations that are over the limit or idle past the TTL."""
+        while self._conversations:
+            oldest = next(iter(self._conversations))
+            if len(self._conversations) <= self.max_conversations and now - self._active[oldest] <= self.ttl_seconds:
+                break
+            del self._conversations[oldest]
+            del self._last_turn[oldest]
+            del self._active[oldest]
+
+    def budget_event(self, event: str):
+        self.metric_budget.inc(event=event)
+
+    def conversation_tokens(self, conversation_id: str) -> int:
+        usage = self._conversations.get(conversation_id)
+        return usage.input_tokens + usage.output_tokens if usage else 0
+
+    def conversation(self, conversation_id: str) -> Usage:
+        return to_usage(self._conversations.get(conversation_id, RunUsage()))
+
+    def last_turn(self, conversation_id: str) -> Usage:
+        return to_usage(self._last_turn.get(conversation_id, RunUsage()))
+
+
+usage_tracker = UsageTracker(settings.usage_max_conversations, settings.usage_ttl_seconds)
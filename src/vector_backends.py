@@ -0,0 +1,418 @@
+"""Vector storage backends used by VectorDB."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SearchHit(NamedTuple):
+    """A single search result."""
+    id: Any
+    score: float
+    payload: Dict
+
+
+class QdrantBackend:
+    """Embedded local Qdrant client (no server needed)."""
+
+    def __init__(self):
+        from qdrant_client import QdrantClient
+
+        self.path = tempfile.mkdtemp()
+        self.client = QdrantClient(path=self.path)
+
+    def close(self):
+        """Close the client and delete its local storage directory."""
+        try:
+            self.client.close()
+        finally:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def create_collection(self, name: str, dim: int):
+        """Create (or recreate) a cosine-distance collection."""
+        from qdrant_client.models import Distance, VectorParams
+
+        self.client.recreate_collection(
+            collection_name=name,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE)
+        )
+
+    def upsert(self, name: str, ids: Sequence[Any], vectors: np.ndarray, payloads: Sequence[Dict]):
+        """Insert or replace points."""
+        from qdrant_client.models import PointStruct
+
+        points = [
+            PointStruct(id=point_id, vector=vector.tolist(), payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
+        ]
+        self.client.upsert(collection_name=name, points=points)
+
+    def upsert_chunks(self, name: str, chunks: Iterable[Tuple[Sequence[Any], np.ndarray, Sequence[Dict]]]):
+        """Upsert each (ids, vectors, payloads) chunk as it arrives."""
+        for ids, vectors, payloads in chunks:
+            self.upsert(name, ids, vectors, payloads)
+
+    def search(
+        self,
+        name: str,
+        vector: np.ndarray,
+        limit: int,
+        allowed_ids: Optional[Iterable[Any]] = None
+    ) -> List[SearchHit]:
+        """Cosine search, optionally restricted to a set of point ids."""
+        from qdrant_client.models import Filter, HasIdCondition
+
+        query_filter = None
+        if allowed_ids is not None:
+            query_filter = Filter(must=[HasIdCondition(has_id=sorted(allowed_ids))])
+
+        results = self.client.search(
+            collection_name=name,
+            query_vector=vector.tolist(),
+            query_filter=query_filter,
+            limit=limit
+        )
+        return [SearchHit(result.id, result.score, result.payload) for result in results]
+
+
+# Number of set bits for every byte value, used for Hamming distance on packed codes
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+QUANTIZATIONS = ("none", "int8", "binary")
+
+
+class NumpyCollection:
+    """Normalized float32 embedding matrix with row-aligned ids and payloads.
+
+    With int8 or binary quantization the scan runs over compact codes and only
+    the top candidates are rescored against the float vectors, which are then
+    always memory-mapped: from the saved collection, or from a temporary file
+    under spill_dir when the collection was built in memory.
+    """
+
+    def __init__(
+        self, dim: int, quantization: str = "none", rescore_multiplier: int = 4, spill_dir: Optional[str] = None
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.dim = dim
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        self.spill_dir = spill_dir
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.payloads = np.empty(0, dtype=object)
+        self.codes: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    def upsert(self, ids: Sequence[Any], vectors: np.ndarray, payloads: Sequence[Dict]):
+        """Insert or replace rows, keeping the matrix contiguous."""
+        new_ids = np.asarray(ids, dtype=np.int64)
+        new_vectors = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(new_ids), self.dim))
+        self._replace_rows(new_ids, new_vectors, payloads)
+
+    def upsert_chunks(self, chunks: Iterable[Tuple[Sequence[Any], np.ndarray, Sequence[Dict]]]):
+        """Copy each chunk into a matrix grown in place, then insert or replace the rows once.
+
+        Only the normalized matrix and one chunk are held at a time, not the
+        chunks' vectors plus a stacked copy of them.
+        """
+        ids = np.empty(0, dtype=np.int64)
+        vectors = np.empty((0, self.dim), dtype=np.float32)
+        payloads: List[Dict] = []
+        count = 0
+        for chunk_ids, chunk_vectors, chunk_payloads in chunks:
+            chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+            size = len(chunk_ids)
+            if count + size > len(ids):
+                capacity = max(count + size, len(ids) * 3 // 2, 1024)
+                ids.resize(capacity, refcheck=False)
+                vectors.resize((capacity, self.dim), refcheck=False)
+            ids[count:count + size] = chunk_ids
+            vectors[count:count + size] = normalize_rows(
+                np.asarray(chunk_vectors, dtype=np.float32).reshape(size, self.dim)
+            )
+            payloads.extend(chunk_payloads)
+            count += size
+        if not count:
+            return
+        ids.resize(count, refcheck=False)
+        vectors.resize((count, self.dim), refcheck=False)
+        self._replace_rows(ids, vectors, payloads)
+
+    def _replace_rows(self, new_ids: np.ndarray, new_vectors: np.ndarray, payloads: Sequence[Dict]):
+        new_payloads = np.empty(len(new_ids), dtype=object)
+        new_payloads[:] = list(payloads)
+
+        if len(self.ids):
+            keep = ~np.isin(self.ids, new_ids)
+            self.ids = np.concatenate([self.ids[keep], new_ids])
+            self.vectors = np.ascontiguousarray(np.vstack([self.vectors[keep], new_vectors]))
+            self.payloads = np.concatenate([self.payloads[keep], new_payloads])
+        else:
+            # Fresh collection: take the rows as they are instead of copying the matrix again
+            self.ids = new_ids
+            self.vectors = np.ascontiguousarray(new_vectors)
+            self.payloads = new_payloads
+        self.quantize()
+        if self.codes is not None:
+            # Searches scan the codes and only rescore a few float rows: keep the floats off the heap
+            self.vectors = _spill(self.vectors, self.spill_dir)
+
+    def quantize(self):
+        """Recompute quantized codes from the float vectors."""
+        if self.quantization == "int8":
+            # Symmetric per-dimension scale so the full int8 range is used
+            scale = np.abs(self.vectors).max(axis=0) / 127.0 if len(self.vectors) else np.ones(self.dim)
+            scale[scale == 0] = 1.0
+            self.scale = scale.astype(np.float32)
+            self.codes = np.clip(np.rint(self.vectors / self.scale), -127, 127).astype(np.int8)
+        elif self.quantization == "binary":
+            self.codes = np.packbits(self.vectors > 0, axis=1)
+            self.scale = None
+        else:
+            self.codes = None
+            self.scale = None
+
+    def _approximate_scores(self, query: np.ndarray, block_size: int = 4096) -> np.ndarray:
+        """Scores from quantized codes; blocks bound the temporary float copy."""
+        if self.quantization == "binary":
+            query_bits = np.packbits(query > 0)
+            distances = np.empty(len(self.codes), dtype=np.int32)
+            for start in range(0, len(self.codes), block_size):
+                block = self.codes[start:start + block_size]
+                distances[start:start + block_size] = POPCOUNT[block ^ query_bits].sum(axis=1, dtype=np.int32)
+            return -distances.astype(np.float32)
+
+        scaled_query = query * self.scale
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), block_size):
+            scores[start:start + block_size] = self.codes[start:start + block_size].astype(np.float32) @ scaled_query
+        return scores
+
+    def search(self, vector: np.ndarray, limit: int, allowed_ids: Optional[Iterable[Any]] = None) -> List[SearchHit]:
+        """Vectorized cosine scores, id mask, then argpartition top-k."""
+        if not len(self.ids) or limit <= 0:
+            return []
+
+        query = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+        quantized = self.codes is not None
+        scores = self._approximate_scores(query) if quantized else self.vectors @ query
+
+        if allowed_ids is not None:
+            mask = np.isin(self.ids, np.fromiter(allowed_ids, dtype=np.int64))
+            available = int(mask.sum())
+            scores = np.where(mask, scores, -np.inf)
+        else:
+            available = len(scores)
+
+        k = min(limit * self.rescore_multiplier if quantized else limit, available)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+
+        if quantized:
+            # Rescore the shortlist with exact float cosine (touches only k rows of the mmap)
+            rows = np.sort(top)
+            exact = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            order = np.argsort(-exact)[:limit]
+            return [
+                SearchHit(int(self.ids[rows[i]]), float(exact[i]), self.payloads[rows[i]]) for i in order
+            ]
+
+        top = top[np.argsort(-scores[top])]
+        return [SearchHit(int(self.ids[row]), float(scores[row]), self.payloads[row]) for row in top]
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Bytes held on the heap by this collection; memory-mapped arrays are counted under "mapped"."""
+        arrays = {"vectors": [self.vectors], "codes": [self.codes, self.scale], "ids": [self.ids]}
+        sizes = {name: 0 for name in arrays}
+        sizes["mapped"] = 0
+        for name, group in arrays.items():
+            for array in group:
+                if array is not None:
+                    sizes["mapped" if isinstance(array, np.memmap) else name] += array.nbytes
+        return sizes
+
+    def save(self, directory: str, name: str, fingerprint: str):
+        """Write ids, vectors and payloads as flat files, atomically replacing old ones."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        _atomic_write(f"{base}.ids.npy", lambda f: np.save(f, self.ids))
+        _atomic_write(f"{base}.vectors.npy", lambda f: np.save(f, np.ascontiguousarray(self.vectors)))
+        # Codes of other modes would not match these vectors; don't leave them to be picked up later
+        for quantization in QUANTIZATIONS:
+            if quantization != self.quantization or self.codes is None:
+                for path in (f"{base}.{quantization}.npy", f"{base}.{quantization}.scale.npy"):
+                    if os.path.exists(path):
+                        os.remove(path)
+        if self.codes is not None:
+            _atomic_write(f"{base}.{self.quantization}.npy", lambda f: np.save(f, self.codes))
+            if self.scale is not None:
+                _atomic_write(f"{base}.{self.quantization}.scale.npy", lambda f: np.save(f, self.scale))
+        _atomic_write(f"{base}.payloads.json", lambda f: f.write(json.dumps(list(self.payloads)).encode("utf-8")))
+        # Meta is written last so readers never see a fingerprint for half-written data
+        meta = {"fingerprint": fingerprint, "dim": self.dim, "count": len(self.ids)}
+        if self.codes is not None:
+            meta["quantization"] = self.quantization
+            meta["codes_sha256"] = _codes_digest(self.codes, self.scale)
+        _atomic_write(f"{base}.meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        name: str,
+        fingerprint: str = None,
+        mmap: bool = True,
+        quantization: str = "none",
+        rescore_multiplier: int = 4
+    ) -> Optional["NumpyCollection"]:
+        """Open a saved collection (vectors memory-mapped read-only); None if missing or stale.
+
+        Saved codes are reused only if meta records the same quantization and
+        their checksum; otherwise they are recomputed from the vectors.
+        Quantized collections always memory-map the vectors.
+        """
+        base = os.path.join(directory, name)
+        mmap_mode = "r" if mmap or quantization != "none" else None
+        try:
+            with open(f"{base}.meta.json", "r") as f:
+                meta = json.load(f)
+            if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+                return None
+
+            collection = cls(meta["dim"], quantization, rescore_multiplier)
+            collection.ids = np.load(f"{base}.ids.npy")
+            collection.vectors = np.load(f"{base}.vectors.npy", mmap_mode=mmap_mode)
+            with open(f"{base}.payloads.json", "r") as f:
+                payloads = json.load(f)
+            collection.payloads = np.empty(len(payloads), dtype=object)
+            collection.payloads[:] = payloads
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if len(collection.ids) != meta["count"] or collection.vectors.shape != (meta["count"], meta["dim"]):
+            return None
+
+        if quantization != "none":
+            try:
+                if meta.get("quantization") != quantization:
+                    raise ValueError(f"No {quantization} codes saved")
+                collection.codes = np.load(f"{base}.{quantization}.npy", mmap_mode=mmap_mode)
+                if quantization == "int8":
+                    collection.scale = np.load(f"{base}.{quantization}.scale.npy")
+                if _codes_digest(collection.codes, collection.scale) != meta.get("codes_sha256"):
+                    raise ValueError("Saved codes do not match meta")
+            except (OSError, ValueError):
+                collection.quantize()
+        return collection
+
+
+class NumpyBackend:
+    """In-memory brute-force backend for small catalogs."""
+
+    def __init__(self, quantization: str = "none", rescore_multiplier: int = 4, spill_dir: Optional[str] = None):
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        self.spill_dir = spill_dir
+        self.collections: Dict[str, NumpyCollection] = {}
+
+    def create_collection(self, name: str, dim: int):
+        """Create (or recreate) an empty collection."""
+        self.collections[name] = NumpyCollection(dim, self.quantization, self.rescore_multiplier, self.spill_dir)
+
+    def upsert(self, name: str, ids: Sequence[Any], vectors: np.ndarray, payloads: Sequence[Dict]):
+        """Insert or replace rows."""
+        self.collections[name].upsert(ids, vectors, payloads)
+
+    def upsert_chunks(self, name: str, chunks: Iterable[Tuple[Sequence[Any], np.ndarray, Sequence[Dict]]]):
+        """Upsert (ids, vectors, payloads) chunks, building the matrix incrementally."""
+        self.collections[name].upsert_chunks(chunks)
+
+    def save(self, name: str, directory: str, fingerprint: str):
+        """Persist a collection to flat files under directory."""
+        self.collections[name].save(directory, name, fingerprint)
+
+    def load(self, name: str, directory: str, fingerprint: str) -> bool:
+        """Replace a collection with its memory-mapped copy on disk if it is current."""
+        collection = NumpyCollection.load(
+            directory, name, fingerprint,
+            quantization=self.quantization,
+            rescore_multiplier=self.rescore_multiplier
+        )
+        if collection is None:
+            return False
+        self.collections[name] = collection
+        return True
+
+    def close(self):
+        """Drop all collections, releasing their matrices and memory maps."""
+        self.collections = {}
+
+    def payloads(self, name: str) -> List[Dict]:
+        """All payloads of a collection, in row order."""
+        return list(self.collections[name].payloads)
+
+    def search(
+        self,
+        name: str,
+        vector: np.ndarray,
+        limit: int,
+        allowed_ids: Optional[Iterable[Any]] = None
+    ) -> List[SearchHit]:
+        """Cosine search, optionally restricted to a set of ids."""
+        return self.collections[name].search(vector, limit, allowed_ids)
+
+    def memory_bytes(self) -> Dict[str, Dict[str, int]]:
+        """Resident bytes per collection."""
+        return {name: collection.memory_bytes() for name, collection in self.collections.items()}
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so a dot product is cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _codes_digest(codes: np.ndarray, scale: Optional[np.ndarray]) -> str:
+    digest = hashlib.sha256(np.ascontiguousarray(codes).tobytes())
+    if scale is not None:
+        digest.update(np.ascontiguousarray(scale).tobytes())
+    return digest.hexdigest()
+
+
+def _spill(matrix: np.ndarray, directory: Optional[str] = None) -> np.ndarray:
+    """Copy a matrix into an unlinked temporary file and memory-map it, so it is paged in on demand."""
+    if isinstance(matrix, np.memmap) or not matrix.size:
+        return matrix
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # The mapping keeps the file alive after it is closed; it is removed with the last reference
+    with tempfile.TemporaryFile(dir=directory) as f:
+        mapped = np.memmap(f, dtype=matrix.dtype, mode="w+", shape=matrix.shape)
+        mapped[:] = matrix
+        mapped.flush()
+    return mapped
+
+
+def _atomic_write(path: str, write):
+    """Write to a temp file in the same directory, then rename over path."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def create_backend(name: str, quantization: str = "none", rescore_multiplier: int = 4, spill_dir: Optional[str] = None):
+    """Create a vector backend by settings name."""
+    if name == "numpy":
+        return NumpyBackend(quantization, rescore_multiplier, spill_dir)
+    if name == "qdrant":
+        return QdrantBackend()
+    raise ValueError(f"Unknown vector backend: {name}")
@@ -1,167 +1,601 @@
-"""Vector database integration with Qdrant."""
+"""Vector database integration with Qdrant or an in-memory NumPy backend."""
 
+import asyncio
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain, islice
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Awaitable, Callable, Iterable, Optional, Tuple
 from .settings import settings
-import tempfile
+from .encoders import create_encoder
+from .lexical_index import BM25Index, ExactMatchIndex, bike_to_text, reciprocal_rank_fusion
+from .query_parser import QueryParser
+from .vector_backends import create_backend
+from .bulk_index import BulkIndexStats, encode_parallel
+from .catalog import IngestReport, batched, catalog_path, iter_bikes
+from .deadlines import DeadlineExceeded, check_deadline
+from .faq import FAQ_PATH, parse_faq, passage_records
+from .reranker import create_reranker
+
+
+# Bump when the text embedded or payload stored per record changes, so persisted vectors are rebuilt
+EMBEDDING_FORMAT = 2
+
+
+@dataclass
+class IndexSnapshot:
+    """One immutable generation of the search indexes.
+    
+    Searches read ``VectorDB.snapshot`` once and use only that object, so a
+    reload can build a new snapshot in the background and swap the pointer
+    while in-flight searches finish on the old one.
+    """
+    version: int
+    backend: Any
+    bikes: Dict[int, Dict] = field(default_factory=dict)
+    faq: List[Dict] = field(default_factory=list)
+    bike_lexicon: BM25Index = field(default_factory=BM25Index)
+    bike_names: ExactMatchIndex = field(default_factory=ExactMatchIndex)
+    query_parser: QueryParser = field(default_factory=QueryParser)
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+    # Catalog ingestion outcome; None when loaded from a prebuilt artifact
+    ingest: Optional[IngestReport] = None
+    # Searches currently running on this snapshot; its backend is closed once they drain
+    searches: int = 0
+
+
+class SharedSearchResults:
+    """Search results reused across the concurrent turns of a batch run.
+    
+    Identical searches (same index version, query, limit and filters) share
+    one in-flight search and its result; empty and failed results are not
+    kept, since they may come from a search that hit its caller's deadline.
+    """
+    
+    def __init__(self):
+        self._results: Dict[Tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, key: Tuple, search: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        future = self._results.get(key)
+        if future is None:
+            self.misses += 1
+            future = self._results[key] = asyncio.ensure_future(search())
+        else:
+            self.hits += 1
+        # One caller's cancellation must not cancel the search for the others
+        try:
+            results = await asyncio.shield(future)
+        except Exception:
+            self._drop(key, future)
+            raise
+        if not results:
+            self._drop(key, future)
+        return list(results)
+    
+    def _drop(self, key: Tuple, future: asyncio.Future):
+        if self._results.get(key) is future:
+            del self._results[key]
+
+
+_shared_results: ContextVar[Optional[SharedSearchResults]] = ContextVar("shared_search_results", default=None)
+
+
+def share_search_results(shared: SharedSearchResults):
+    """Reuse search results through `shared` in the current context and the tasks it starts."""
+    _shared_results.set(shared)
+
+
+@contextmanager
+def _searching(snapshot: IndexSnapshot):
+    """Count a search as in flight on a snapshot, so a reload does not close it underneath."""
+    snapshot.searches += 1
+    try:
+        yield
+    finally:
+        snapshot.searches -= 1
+
+
+def _search_key(kind: str, version: int, query: str, limit: int, filters: Optional[Dict] = None) -> Tuple:
+    return (kind, version, " ".join(query.lower().split()), limit, json.dumps(filters or {}, sort_keys=True, default=str))
 
 
 class VectorDB:
     """Vector database for bike catalog and FAQ search."""
     
     def __init__(self):
-        # Use local file-based Qdrant (no server needed)
-        self.client = QdrantClient(path=tempfile.mkdtemp())
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.encoder = create_encoder()
+        self.reranker = create_reranker()
         self.bike_collection = "bikes"
         self.faq_collection = "faq"
+        self.snapshot = IndexSnapshot(version=0, backend=self._create_backend())
+        self._reload_lock = asyncio.Lock()
+        self._reload_listeners: List[Callable[[int], None]] = []
+        self._retiring = set()
+        self._initialized = False
+        self._query_vectors: "OrderedDict[str, Any]" = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
+    
+    @property
+    def version(self) -> int:
+        """Version of the active index snapshot (0 until initialized)."""
+        return self.snapshot.version
+    
+    @property
+    def ready(self) -> bool:
+        """An index snapshot with bikes is being served."""
+        return self.snapshot.version > 0 and bool(self.snapshot.bikes)
+    
+    @property
+    def backend(self):
+        return self.snapshot.backend
+    
+    @property
+    def bikes(self) -> Dict[int, Dict]:
+        return self.snapshot.bikes
+    
+    @property
+    def faq(self) -> List[Dict]:
+        return self.snapshot.faq
+    
+    @property
+    def fingerprints(self) -> Dict[str, str]:
+        return self.snapshot.fingerprints
+    
+    @staticmethod
+    def _create_backend():
+        # Local file-based Qdrant or in-memory NumPy matrix (no server needed)
+        return create_backend(
+            settings.vector_backend,
+            quantization=settings.vector_quantization,
+            rescore_multiplier=settings.vector_rescore_multiplier,
+            spill_dir=settings.vector_db_path
+        )
         
     async def initialize(self):
         """Initialize vector database with bike catalog and FAQ data."""
+        if self._initialized:
+            return
+        async with self._reload_lock:
+            if self._initialized:
+                return
+            snapshot = await self._build_snapshot(self.snapshot.version + 1, self.snapshot.backend)
+            self._swap(snapshot)
+            self._initialized = True
+            if self.reranker is not None:
+                try:
+                    await asyncio.to_thread(self.reranker.load)
+                except Exception as e:
+                    print(f"Reranker disabled, failed to load {self.reranker.model_name}: {e}")
+                    self.reranker = None
+    
+    async def reload(self) -> bool:
+        """Rebuild the indexes in the background and atomically swap them in.
+        
+        The current snapshot keeps serving until the new one is complete; if the
+        build fails, it stays active.
+        """
+        async with self._reload_lock:
+            snapshot = await self._build_snapshot(self.snapshot.version + 1, self._create_backend())
+            if not self._is_complete(snapshot):
+                print(f"Reload failed, keeping index version {self.snapshot.version}")
+                if snapshot.backend is not self.snapshot.backend:
+                    await asyncio.to_thread(self._close_backend, snapshot.backend)
+                return False
+            previous = self.snapshot
+            self._swap(snapshot)
+            self._initialized = True
+            print(f"Reloaded indexes as version {snapshot.version}")
+            if previous.backend is not snapshot.backend:
+                self._retiring.add(asyncio.create_task(self._retire(previous)))
+            return True
+    
+    async def _retire(self, snapshot: IndexSnapshot, poll_seconds: float = 0.1):
+        """Close a replaced snapshot's backend once its in-flight searches have finished."""
+        try:
+            while snapshot.searches > 0:
+                await asyncio.sleep(poll_seconds)
+            await asyncio.to_thread(self._close_backend, snapshot.backend)
+            print(f"Closed index version {snapshot.version}")
+        finally:
+            self._retiring.discard(asyncio.current_task())
+    
+    @staticmethod
+    def _close_backend(backend):
+        try:
+            if hasattr(backend, 'close'):
+                backend.close()
+        except Exception as e:
+            print(f"Failed to close vector backend: {e}")
+    
+    def add_reload_listener(self, listener: Callable[[int], None]):
+        """Call listener(version) after each swap, e.g. to invalidate dependent caches."""
+        self._reload_listeners.append(listener)
+    
+    def _swap(self, snapshot: IndexSnapshot):
+        """Point searches at a new snapshot and notify listeners."""
+        self.snapshot = snapshot
+        for listener in self._reload_listeners:
+            try:
+                listener(snapshot.version)
+            except Exception as e:
+                print(f"Reload listener failed: {e}")
+    
+    def _is_complete(self, snapshot: IndexSnapshot) -> bool:
+        """Both collections were indexed, from a catalog read to its end with few enough rejected records."""
+        if set(snapshot.fingerprints) != {self.bike_collection, self.faq_collection}:
+            return False
+        report = snapshot.ingest
+        if report is None:
+            return True
+        if not report.complete or not report.accepted:
+            print(f"Catalog ended early or is empty ({report})")
+            return False
+        if report.rejected > settings.reload_max_rejected_ratio * (report.accepted + report.rejected):
+            print(f"Too many rejected catalog records ({report})")
+            return False
+        return True
+    
+    def watched_paths(self) -> List[str]:
+        """Files whose changes should trigger a reload."""
+        if settings.index_artifact_path:
+            from .index_artifact import CURRENT
+            return [os.path.join(settings.index_artifact_path, CURRENT)]
+        return [catalog_path(), FAQ_PATH]
+    
+    async def _build_snapshot(self, version: int, backend) -> IndexSnapshot:
+        """Build a complete snapshot from the artifact or Data/ without touching the active one."""
+        snapshot = IndexSnapshot(version=version, backend=backend)
+        
+        # Prebuilt read-only index artifact: no catalog parsing or encoding at boot
+        if settings.index_artifact_path:
+            if self._load_artifact(snapshot, settings.index_artifact_path):
+                return snapshot
+            print("Falling back to building indexes from Data/")
+        
         try:
             # Create collections
-            await self._create_collection(self.bike_collection)
-            await self._create_collection(self.faq_collection)
+            await self._create_collection(snapshot, self.bike_collection)
+            await self._create_collection(snapshot, self.faq_collection)
             
             # Load and index data
-            await self._index_bikes()
-            await self._index_faq()
+            await self._index_bikes(snapshot)
+            await self._index_faq(snapshot)
             
         except Exception as e:
             print(f"Vector DB initialization failed: {e}")
+        return snapshot
     
-    async def _create_collection(self, collection_name: str):
+    async def _create_collection(self, snapshot: IndexSnapshot, collection_name: str):
         """Create a collection if it doesn't exist."""
         try:
-            self.client.recreate_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=384, distance=Distance.COSINE)
-            )
+            snapshot.backend.create_collection(collection_name, dim=self.encoder.dim)
         except Exception as e:
             print(f"Failed to create collection {collection_name}: {e}")
     
-    async def _index_bikes(self):
-        """Index bike catalog data."""
+    async def _index_bikes(self, snapshot: IndexSnapshot):
+        """Index bike catalog data, streamed and validated record by record."""
         try:
-            data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Data", "product_catalog.json")
-            with open(data_path, 'r') as f:
-                bikes = json.load(f)
-            
-            points = []
-            for bike in bikes:
-                # Create searchable text
-                text = f"{bike['name']} {bike['brand']} {bike['type']} {' '.join(bike['intended_use'])}"
-                vector = self.encoder.encode(text).tolist()
-                
-                points.append(PointStruct(
-                    id=bike['id'],
-                    vector=vector,
-                    payload=bike
-                ))
-            
-            self.client.upsert(collection_name=self.bike_collection, points=points)
-            print(f"Indexed {len(points)} bikes")
+            data_path = catalog_path()
+            report = snapshot.ingest = IngestReport()
+            # The snapshot's id -> bike map; the vector backend holds references to the same dicts
+            bikes = {}
+            
+            def records():
+                for bike in iter_bikes(data_path, report):
+                    bikes[bike['id']] = bike
+                    yield bike['id'], bike_to_text(bike), bike
+            
+            fingerprint = self._fingerprint(data_path)
+            if self._restore_collection(snapshot, self.bike_collection, fingerprint):
+                for _ in records():
+                    pass
+            else:
+                await asyncio.to_thread(self._encode_and_upsert, snapshot, self.bike_collection, records())
+                self._persist_collection(snapshot, self.bike_collection, fingerprint)
+            
+            self._build_bike_indexes(snapshot, bikes)
+            snapshot.fingerprints[self.bike_collection] = fingerprint
+            print(f"Indexed {len(bikes)} bikes ({report})")
+            for error in report.errors[:10]:
+                print(f"  rejected {error}")
             
         except Exception as e:
             print(f"Failed to index bikes: {e}")
     
-    async def _index_faq(self):
-        """Index FAQ data."""
+    @staticmethod
+    def _build_bike_indexes(snapshot: IndexSnapshot, bikes: Dict[int, Dict]):
+        """Build the in-memory lexical indexes for exact-token and name/brand lookups."""
+        snapshot.bikes = bikes
+        bikes = list(bikes.values())
+        snapshot.bike_lexicon.build((bike['id'], bike_to_text(bike)) for bike in bikes)
+        snapshot.bike_names.build(bikes)
+        snapshot.query_parser = QueryParser.from_catalog(bikes)
+    
+    def _load_artifact(self, snapshot: IndexSnapshot, path: str) -> bool:
+        """Load a prebuilt index artifact (see build_index.py) read-only via mmap."""
+        from .index_artifact import read_manifest, resolve_artifact
+        
         try:
-            data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Data", "faq.txt")
-            with open(data_path, 'r') as f:
-                faq_content = f.read()
-            
-            # Parse FAQ format: numbered questions followed by answers
-            lines = faq_content.split('\n')
-            points = []
-            faq_id = 1
-            
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Look for numbered questions (e.g., "1. Do you offer...")
-                if line and line[0].isdigit() and '. ' in line:
-                    question = line.split('. ', 1)[1] if '. ' in line else line
-                    answer = ""
-                    
-                    # Collect answer lines until next question or end
-                    j = i + 1
-                    while j < len(lines):
-                        next_line = lines[j].strip()
-                        if next_line and next_line[0].isdigit() and '. ' in next_line:
-                            break
-                        if next_line:  # Skip empty lines
-                            answer += next_line + " "
-                        j += 1
-                    
-                    answer = answer.strip()
-                    
-                    if question and answer:
-                        text = f"{question} {answer}"
-                        vector = self.encoder.encode(text).tolist()
-                        
-                        points.append(PointStruct(
-                            id=faq_id,
-                            vector=vector,
-                            payload={"question": question, "answer": answer}
-                        ))
-                        faq_id += 1
-                
-                i += 1
-            
-            self.client.upsert(collection_name=self.faq_collection, points=points)
-            print(f"Indexed {len(points)} FAQ items")
+            artifact_dir = resolve_artifact(path)
+            manifest = read_manifest(artifact_dir)
+            if manifest['encoder'] != self.encoder.name:
+                print(f"Index artifact encoder {manifest['encoder']} does not match {self.encoder.name}")
+                return False
+            
+            backend = create_backend(
+                "numpy",
+                quantization=manifest.get('quantization', 'none'),
+                rescore_multiplier=settings.vector_rescore_multiplier
+            )
+            for collection_name, info in manifest['collections'].items():
+                if not backend.load(collection_name, artifact_dir, info['fingerprint']):
+                    print(f"Index artifact collection {collection_name} is missing or inconsistent")
+                    return False
+            
+            if snapshot.backend is not backend:
+                self._close_backend(snapshot.backend)
+            snapshot.backend = backend
+            snapshot.fingerprints = {name: info['fingerprint'] for name, info in manifest['collections'].items()}
+            self._build_bike_indexes(snapshot, {bike['id']: bike for bike in backend.payloads(self.bike_collection)})
+            faq = {entry['id']: entry for entry in backend.payloads(self.faq_collection)}
+            snapshot.faq = [faq[faq_id] for faq_id in sorted(faq)]
+            print(f"Loaded index artifact {manifest['version']} ({len(snapshot.bikes)} bikes)")
+            return True
             
         except Exception as e:
-            print(f"Failed to index FAQ: {e}")
+            print(f"Failed to load index artifact {path}: {e}")
+            return False
     
-    async def search_bikes(self, query: str, limit: int = 5, filters: Dict = None) -> List[Dict]:
-        """Search bikes using vector similarity."""
+    async def _index_faq(self, snapshot: IndexSnapshot):
+        """Index FAQ data, streamed in one pass and split into passage-sized records."""
         try:
-            query_vector = self.encoder.encode(query).tolist()
+            data_path = FAQ_PATH
+            entries = []
+            
+            def records():
+                with open(data_path, 'r', encoding='utf-8') as f:
+                    for entry in parse_faq(f):
+                        entries.append(entry)
+                        yield entry
             
-            results = self.client.search(
-                collection_name=self.bike_collection,
-                query_vector=query_vector,
-                limit=limit
+            fingerprint = self._fingerprint(data_path, f"passage_words={settings.faq_passage_words}")
+            if self._restore_collection(snapshot, self.faq_collection, fingerprint):
+                for _ in records():
+                    pass
+            else:
+                passages = passage_records(records(), settings.faq_passage_words)
+                await asyncio.to_thread(self._encode_and_upsert, snapshot, self.faq_collection, passages)
+                self._persist_collection(snapshot, self.faq_collection, fingerprint)
+            snapshot.faq = entries
+            snapshot.fingerprints[self.faq_collection] = fingerprint
+            print(f"Indexed {len(entries)} FAQ items")
+            
+        except Exception as e:
+            print(f"Failed to index FAQ: {e}")
+    
+    def _encode_and_upsert(self, snapshot: IndexSnapshot, collection_name: str, records: Iterable[Tuple[Any, str, Dict]]):
+        """Encode (id, text, payload) records in chunks and upsert them as they are encoded.
+        
+        Large collections go through the encoder process pool.
+        """
+        records = iter(records)
+        head = list(islice(records, settings.bulk_index_min_records))
+        use_pool = settings.index_workers > 1 and len(head) >= settings.bulk_index_min_records
+        
+        chunks = (
+            ((
+                [record[0] for record in batch],
+                [record[2] for record in batch]
+            ), [record[1] for record in batch])
+            for batch in batched(chain(head, records), settings.index_chunk_size)
+        )
+        if use_pool:
+            stats = BulkIndexStats()
+            encoded = encode_parallel(chunks, settings.index_workers, stats)
+        else:
+            encoded = ((context, self.encoder.encode(texts)) for context, texts in chunks)
+        
+        snapshot.backend.upsert_chunks(
+            collection_name,
+            ((ids, vectors, payloads) for (ids, payloads), vectors in encoded)
+        )
+        if use_pool:
+            print(f"Bulk indexed {collection_name}: {stats}")
+    
+    def _fingerprint(self, source_path: str, options: str = "") -> str:
+        """Digest of the encoder, embedding text format and source file, used to detect stale vectors."""
+        digest = hashlib.sha256(f"{self.encoder.name}:{EMBEDDING_FORMAT}:{options}".encode('utf-8'))
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _restore_collection(self, snapshot: IndexSnapshot, collection_name: str, fingerprint: str) -> bool:
+        """Memory-map persisted vectors shared with other workers, if they are current."""
+        if not settings.vector_mmap or not hasattr(snapshot.backend, 'load'):
+            return False
+        restored = snapshot.backend.load(collection_name, settings.vector_db_path, fingerprint)
+        if restored:
+            print(f"Memory-mapped {collection_name} vectors from {settings.vector_db_path}")
+        return restored
+    
+    def _persist_collection(self, snapshot: IndexSnapshot, collection_name: str, fingerprint: str):
+        """Write freshly encoded vectors to disk and reopen them memory-mapped."""
+        if not settings.vector_mmap or not hasattr(snapshot.backend, 'save'):
+            return
+        try:
+            snapshot.backend.save(collection_name, settings.vector_db_path, fingerprint)
+            snapshot.backend.load(collection_name, settings.vector_db_path, fingerprint)
+        except OSError as e:
+            print(f"Failed to persist {collection_name} vectors: {e}")
+    
+    def embed_query(self, text: str):
+        """Encode a search query, reusing vectors of recent identical queries (LRU)."""
+        key = " ".join(text.split())
+        with self._query_vectors_lock:
+            vector = self._query_vectors.get(key)
+            if vector is not None:
+                self._query_vectors.move_to_end(key)
+                return vector
+        
+        vector = self.encoder.encode(key)
+        if settings.query_cache_size > 0:
+            with self._query_vectors_lock:
+                self._query_vectors[key] = vector
+                while len(self._query_vectors) > settings.query_cache_size:
+                    self._query_vectors.popitem(last=False)
+        return vector
+    
+    async def search_bikes(self, query: str, limit: int = 5, filters: Dict = None, query_vector=None) -> List[Dict]:
+        """Search bikes using hybrid lexical + vector similarity.
+        
+        A precomputed query_vector (e.g. of the whole chat message) skips encoding.
+        """
+        snapshot = self.snapshot
+        shared = _shared_results.get()
+        with _searching(snapshot):
+            if shared is None:
+                return await self._search_bikes(snapshot, query, limit, filters, query_vector)
+            return await shared.get(
+                _search_key("bikes", snapshot.version, query, limit, filters),
+                lambda: self._search_bikes(snapshot, query, limit, filters, query_vector)
             )
+    
+    async def _search_bikes(self, snapshot: IndexSnapshot, query: str, limit: int, filters: Dict, query_vector) -> List[Dict]:
+        try:
+            check_deadline()
             
-            bikes = []
-            for result in results:
-                bike = result.payload
-                # Apply filters
-                if filters:
-                    if 'price_max' in filters and bike['price_eur'] > filters['price_max']:
-                        continue
-                    if 'type' in filters and bike['type'].lower() != filters['type'].lower():
-                        continue
-                bikes.append(bike)
+            # Exact name/brand fast path skips encoding entirely
+            exact_ids = snapshot.bike_names.lookup(query)
+            if exact_ids:
+                return self._filter_bikes(snapshot, exact_ids, filters)[:limit]
+            
+            # Filters stated in the query text become pre-filters; explicit ones win
+            search_text = query
+            if settings.query_parsing:
+                parsed = snapshot.query_parser.parse(query)
+                search_text = parsed.text
+                if parsed.filters:
+                    merged = {**parsed.filters, **(filters or {})}
+                    # Fall back to the caller's filters if the parsed ones exclude everything
+                    if self._allowed_ids(snapshot, merged):
+                        filters = merged
+            
+            allowed_ids = self._allowed_ids(snapshot, filters) if filters else None
+            if allowed_ids is not None and not allowed_ids:
+                return []
             
-            return bikes
+            candidates = max(limit, settings.search_candidates)
+            if query_vector is None:
+                # Encoding runs off the event loop so concurrent tool calls overlap
+                query_vector = await asyncio.to_thread(self.embed_query, search_text)
             
+            results = snapshot.backend.search(self.bike_collection, query_vector, candidates, allowed_ids)
+            vector_ids = [result.id for result in results]
+            
+            if settings.hybrid_search:
+                lexical_ids = [
+                    bike_id for bike_id, _ in snapshot.bike_lexicon.search(search_text, limit=len(snapshot.bikes))
+                    if allowed_ids is None or bike_id in allowed_ids
+                ][:candidates]
+                ranked_ids = reciprocal_rank_fusion([vector_ids, lexical_ids], k=settings.rrf_k)
+            else:
+                ranked_ids = vector_ids
+            
+            bikes = self._filter_bikes(snapshot, ranked_ids, filters)
+            reranker = self.reranker
+            if reranker is not None and limit > 1 and len(bikes) > 1:
+                # Second stage over the top candidates; keeps the fused order if over budget
+                bikes = await reranker.rerank(
+                    query, bikes[:max(limit, settings.rerank_candidates)], snapshot.version, settings.rerank_timeout
+                )
+            return bikes[:limit]
+            
+        except DeadlineExceeded:
+            # Out of time: let the turn stop instead of answering from an empty result
+            raise
         except Exception as e:
             print(f"Bike search failed: {e}")
             return []
     
-    async def search_faq(self, question: str, limit: int = 3) -> List[Dict]:
+    def _allowed_ids(self, snapshot: IndexSnapshot, filters: Dict) -> set:
+        """Ids of catalog entries passing the filters."""
+        return {bike_id for bike_id, bike in snapshot.bikes.items() if self._matches_filters(bike, filters)}
+    
+    def _filter_bikes(self, snapshot: IndexSnapshot, bike_ids: List[int], filters: Dict = None) -> List[Dict]:
+        """Resolve bike ids to catalog entries and apply filters."""
+        bikes = []
+        for bike_id in bike_ids:
+            bike = snapshot.bikes.get(bike_id)
+            if bike is None:
+                continue
+            if filters and not self._matches_filters(bike, filters):
+                continue
+            bikes.append(bike)
+        return bikes
+    
+    @staticmethod
+    def _matches_filters(bike: Dict, filters: Dict) -> bool:
+        """Check a catalog entry against price, type, brand, wheel, material and use filters."""
+        if 'price_max' in filters and bike['price_eur'] > filters['price_max']:
+            return False
+        if 'price_min' in filters and bike['price_eur'] < filters['price_min']:
+            return False
+        if 'wheel_size' in filters and float(bike.get('wheel_size', 0)) != float(filters['wheel_size']):
+            return False
+        for single, multi, field in (
+            ('type', 'types', 'type'),
+            ('brand', 'brands', 'brand'),
+            ('frame_material', 'frame_materials', 'frame_material'),
+        ):
+            wanted = filters[single] if single in filters else filters.get(multi)
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            if wanted and str(bike.get(field, '')).lower() not in {value.lower() for value in wanted}:
+                return False
+        if filters.get('intended_use'):
+            uses = filters['intended_use']
+            wanted = {value.lower() for value in ([uses] if isinstance(uses, str) else uses)}
+            if not wanted & {use.lower() for use in bike.get('intended_use', [])}:
+                return False
+        return True
+    
+    async def search_faq(self, question: str, limit: int = 3, query_vector=None) -> List[Dict]:
         """Search FAQ using vector similarity."""
+        snapshot = self.snapshot
+        shared = _shared_results.get()
+        with _searching(snapshot):
+            if shared is None:
+                return await self._search_faq(snapshot, question, limit, query_vector)
+            return await shared.get(
+                _search_key("faq", snapshot.version, question, limit),
+                lambda: self._search_faq(snapshot, question, limit, query_vector)
+            )
+    
+    async def _search_faq(self, snapshot: IndexSnapshot, question: str, limit: int, query_vector) -> List[Dict]:
         try:
-            query_vector = self.encoder.encode(question).tolist()
+            check_deadline()
+            if query_vector is None:
+                query_vector = await asyncio.to_thread(self.embed_query, question)
             
-            results = self.client.search(
-                collection_name=self.faq_collection,
-                query_vector=query_vector,
-                limit=limit
-            )
+            # Long answers are indexed as several passages; keep each entry's best passage
+            results = snapshot.backend.search(self.faq_collection, query_vector, limit * 3)
             
-            return [result.payload for result in results]
+            entries = {}
+            for result in results:
+                entries.setdefault(result.payload['id'], result.payload)
+            return list(entries.values())[:limit]
             
+        except DeadlineExceeded:
+            # Out of time: let the turn stop instead of answering from an empty result
+            raise
         except Exception as e:
             print(f"FAQ search failed: {e}")
             return []